@@ -0,0 +1,46 @@
+"""transfers
+
+Revision ID: a1f7e3c9b258
+Revises: f6c1d8b2e947
+Create Date: 2026-10-18 18:20:51.730462
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1f7e3c9b258'
+down_revision: Union[str, None] = 'f6c1d8b2e947'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('transfer',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('from_wallet_id', sa.Integer(), nullable=False),
+    sa.Column('to_wallet_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('description', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.CheckConstraint('from_wallet_id <> to_wallet_id', name='ck_transfer_distinct_wallets'),
+    sa.CheckConstraint('amount > 0', name='ck_transfer_amount_positive'),
+    sa.ForeignKeyConstraint(['from_wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['to_wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transfer_user_id_created_at', 'transfer', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_transfer_from_wallet_id', 'transfer', ['from_wallet_id'], unique=False)
+    op.create_index('ix_transfer_to_wallet_id', 'transfer', ['to_wallet_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transfer_to_wallet_id', table_name='transfer')
+    op.drop_index('ix_transfer_from_wallet_id', table_name='transfer')
+    op.drop_index('ix_transfer_user_id_created_at', table_name='transfer')
+    op.drop_table('transfer')
@@ -0,0 +1,29 @@
+"""wallet and operation wallet indexes
+
+Revision ID: a7e04d2f9c68
+Revises: f2a9c4e7b013
+Create Date: 2026-10-18 13:48:22.914053
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e04d2f9c68'
+down_revision: Union[str, None] = 'f2a9c4e7b013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_wallet_user_id'), 'wallet', ['user_id'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_operation_wallet_id_created_at', 'operation', ['wallet_id', 'created_at', 'id'], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_operation_wallet_id_created_at', table_name='operation', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_wallet_user_id'), table_name='wallet', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,42 @@
+"""operation aggregates
+
+Revision ID: b5d2e8a41f07
+Revises: 63f899a03deb
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2e8a41f07'
+down_revision: Union[str, None] = '63f899a03deb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('operation_aggregate',
+    sa.Column('wallet_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('type_operation', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(precision=2), nullable=False),
+    sa.Column('operations_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('wallet_id', 'category', 'type_operation')
+    )
+    op.execute(
+        "INSERT INTO operation_aggregate (wallet_id, category, type_operation, user_id, total, operations_count) "
+        "SELECT wallet_id, category, type_operation, user_id, SUM(amount), COUNT(*) "
+        "FROM operation GROUP BY wallet_id, category, type_operation, user_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('operation_aggregate')
@@ -0,0 +1,63 @@
+"""recurring operations and operation idempotency key
+
+Revision ID: c3e7a1f5d820
+Revises: a7e04d2f9c68
+Create Date: 2026-10-18 15:02:37.561208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e7a1f5d820'
+down_revision: Union[str, None] = 'a7e04d2f9c68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CATEGORY = postgresql.ENUM(name='category', create_type=False)
+TYPE_OPERATION = postgresql.ENUM(name='type_operation', create_type=False)
+INTERVAL = postgresql.ENUM('daily', 'weekly', 'monthly', name='recurring_interval')
+
+
+def upgrade() -> None:
+    INTERVAL.create(op.get_bind(), checkfirst=True)
+    op.create_table('recurring_operation',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('wallet_id', sa.Integer(), nullable=False),
+    sa.Column('category', CATEGORY, nullable=False),
+    sa.Column('type_operation', TYPE_OPERATION, nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('interval', postgresql.ENUM(name='recurring_interval', create_type=False), nullable=False),
+    sa.Column('starts_at', sa.DateTime(), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_recurring_operation_user_id'), 'recurring_operation', ['user_id'], unique=False)
+    op.create_index('ix_recurring_operation_next_run_at', 'recurring_operation', ['next_run_at'], unique=False, postgresql_where=sa.text('is_active'))
+
+    # Nullable without a default: a catalog-only change, existing rows are not rewritten.
+    op.add_column('operation', sa.Column('idempotency_key', sa.String(length=128), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index('ux_operation_idempotency_key', 'operation', ['idempotency_key'], unique=True, postgresql_where=sa.text('idempotency_key IS NOT NULL'), postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_operation_idempotency_key', table_name='operation', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('operation', 'idempotency_key')
+    op.drop_index('ix_recurring_operation_next_run_at', table_name='recurring_operation', postgresql_where=sa.text('is_active'))
+    op.drop_index(op.f('ix_recurring_operation_user_id'), table_name='recurring_operation')
+    op.drop_table('recurring_operation')
+    INTERVAL.drop(op.get_bind())
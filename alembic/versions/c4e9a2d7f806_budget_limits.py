@@ -0,0 +1,81 @@
+"""budget limits
+
+Revision ID: c4e9a2d7f806
+Revises: b8d2f4a6c193
+Create Date: 2026-10-18 19:41:37.205914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a2d7f806'
+down_revision: Union[str, None] = 'b8d2f4a6c193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CATEGORY = postgresql.ENUM(name='category', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table('budget_limit',
+    sa.Column('wallet_id', sa.Integer(), nullable=False),
+    sa.Column('category', CATEGORY, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.CheckConstraint('amount > 0', name='ck_budget_limit_amount_positive'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('wallet_id', 'category')
+    )
+    op.create_index(op.f('ix_budget_limit_user_id'), 'budget_limit', ['user_id'], unique=False)
+    op.create_table('budget_spending',
+    sa.Column('wallet_id', sa.Integer(), nullable=False),
+    sa.Column('category', CATEGORY, nullable=False),
+    sa.Column('period', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('spent', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('wallet_id', 'category', 'period')
+    )
+    op.create_table('budget_alert',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('wallet_id', sa.Integer(), nullable=False),
+    sa.Column('category', CATEGORY, nullable=False),
+    sa.Column('period', sa.DateTime(), nullable=False),
+    sa.Column('threshold', sa.Integer(), nullable=False),
+    sa.Column('limit_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('spent', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('wallet_id', 'category', 'period', 'threshold', name='ux_budget_alert_threshold')
+    )
+    op.create_index('ix_budget_alert_user_id_created_at', 'budget_alert', ['user_id', 'created_at', 'id'], unique=False)
+
+    # Start the counters from the operations already recorded; from here on writes keep them current.
+    op.execute(
+        "INSERT INTO budget_spending (wallet_id, category, period, user_id, spent) "
+        "SELECT wallet_id, category, date_trunc('month', created_at), user_id, SUM(amount) FROM operation "
+        "WHERE type_operation = 'loss' "
+        "GROUP BY wallet_id, category, date_trunc('month', created_at), user_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_budget_alert_user_id_created_at', table_name='budget_alert')
+    op.drop_table('budget_alert')
+    op.drop_table('budget_spending')
+    op.drop_index(op.f('ix_budget_limit_user_id'), table_name='budget_limit')
+    op.drop_table('budget_limit')
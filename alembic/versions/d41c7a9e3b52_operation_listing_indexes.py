@@ -0,0 +1,37 @@
+"""operation listing indexes
+
+Revision ID: d41c7a9e3b52
+Revises: b5d2e8a41f07
+Create Date: 2026-10-18 11:02:15.402671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c7a9e3b52'
+down_revision: Union[str, None] = 'b5d2e8a41f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = {
+    'ix_operation_user_id_created_at': ['user_id', 'created_at', 'id'],
+    'ix_operation_user_id_category_created_at': ['user_id', 'category', 'created_at', 'id'],
+    'ix_operation_user_id_type_operation_created_at': ['user_id', 'type_operation', 'created_at', 'id'],
+}
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps operation writable while the indexes are built.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(name, 'operation', columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name='operation', postgresql_concurrently=True, if_exists=True)
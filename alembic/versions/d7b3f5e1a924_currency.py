@@ -0,0 +1,44 @@
+"""currency
+
+Revision ID: d7b3f5e1a924
+Revises: c4e9a2d7f806
+Create Date: 2026-10-18 20:12:08.531740
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b3f5e1a924'
+down_revision: Union[str, None] = 'c4e9a2d7f806'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing wallets and operations are in BASE_CURRENCY. A constant default makes
+    # ADD COLUMN metadata-only, even on the partitioned operation table; it is
+    # dropped again because writers always set the currency.
+    for table in ('wallet', 'operation'):
+        op.add_column(table, sa.Column('currency', sa.String(length=3), server_default=settings.BASE_CURRENCY, nullable=False))
+        op.alter_column(table, 'currency', server_default=None)
+
+    op.create_table('exchange_rate',
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('rate', sa.Numeric(precision=20, scale=10), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.CheckConstraint('rate > 0', name='ck_exchange_rate_rate_positive'),
+    sa.PrimaryKeyConstraint('currency')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('exchange_rate')
+    op.drop_column('operation', 'currency')
+    op.drop_column('wallet', 'currency')
@@ -0,0 +1,125 @@
+"""range-partition operation by month
+
+Revision ID: d9b4f2e6a135
+Revises: c3e7a1f5d820
+Create Date: 2026-10-18 16:21:09.304817
+
+"""
+import datetime
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b4f2e6a135'
+down_revision: Union[str, None] = 'c3e7a1f5d820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PARTITIONS_AHEAD = 3
+
+CATEGORY = postgresql.ENUM(name='category', create_type=False)
+TYPE_OPERATION = postgresql.ENUM(name='type_operation', create_type=False)
+
+INDEXES = {
+    'ix_operation_user_id_created_at': ['user_id', 'created_at', 'id'],
+    'ix_operation_user_id_category_created_at': ['user_id', 'category', 'created_at', 'id'],
+    'ix_operation_user_id_type_operation_created_at': ['user_id', 'type_operation', 'created_at', 'id'],
+    'ix_operation_wallet_id_created_at': ['wallet_id', 'created_at', 'id'],
+}
+IDEMPOTENCY_WHERE = sa.text('idempotency_key IS NOT NULL')
+
+
+def following(month: datetime.datetime) -> datetime.datetime:
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def upgrade() -> None:
+    # Every month of the existing history gets its own partition, so old
+    # months are pruned by queries and archived one at a time. The rows are
+    # copied once, here: run it in a maintenance window on large tables.
+    bind = op.get_bind()
+    first, boundary = bind.execute(sa.text(
+        "SELECT date_trunc('month', min(created_at)), date_trunc('month', TIMEZONE('utc', now())) + interval '1 month' FROM operation"
+    )).one()
+
+    op.rename_table('operation', 'operation_legacy')
+    # Index names are global; the copy source needs none of them.
+    op.execute('ALTER TABLE operation_legacy DROP CONSTRAINT operation_pkey')
+    op.drop_index('ux_operation_idempotency_key', table_name='operation_legacy')
+    for index in INDEXES:
+        op.drop_index(index, table_name='operation_legacy')
+
+    op.create_table('operation',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('operation_id_seq'::regclass)"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('wallet_id', sa.Integer(), nullable=False),
+    sa.Column('category', CATEGORY, nullable=False),
+    sa.Column('type_operation', TYPE_OPERATION, nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=128), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    # Otherwise dropping the legacy table would drop the sequence.
+    op.execute('ALTER SEQUENCE operation_id_seq OWNED BY operation.id')
+
+    month = (first or boundary - datetime.timedelta(days=1)).replace(day=1)
+    end = boundary
+    for _ in range(PARTITIONS_AHEAD):
+        end = following(end)
+    while month < end:
+        op.execute(f"CREATE TABLE operation_y{month:%Y}m{month:%m} PARTITION OF operation FOR VALUES FROM ('{month}') TO ('{following(month)}')")
+        month = following(month)
+    # Rows outside every range land here and stay live: months past the last
+    # created partition (until ensure_partitions moves them into a new one),
+    # and backdated rows for months that archive_partitions already detached.
+    # The latter are never archived; they keep counting in the aggregates.
+    op.execute('CREATE TABLE operation_default PARTITION OF operation DEFAULT')
+
+    columns = 'id, user_id, wallet_id, category, type_operation, amount, idempotency_key, created_at, updated_at'
+    op.execute(f'INSERT INTO operation ({columns}) SELECT {columns} FROM operation_legacy')
+    op.drop_table('operation_legacy')
+    # Built once per partition after the copy rather than row by row during it.
+    for index, columns in INDEXES.items():
+        op.create_index(index, 'operation', columns, unique=False)
+    op.create_index('ux_operation_idempotency_key', 'operation', ['idempotency_key', 'created_at'], unique=True, postgresql_where=IDEMPOTENCY_WHERE)
+
+    op.create_table('operation_archive_total',
+    sa.Column('wallet_id', sa.Integer(), nullable=False),
+    sa.Column('category', CATEGORY, nullable=False),
+    sa.Column('type_operation', TYPE_OPERATION, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('operations_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['wallet_id'], ['wallet.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('wallet_id', 'category', 'type_operation')
+    )
+
+
+def downgrade() -> None:
+    # Copies the attached partitions back into a plain table; partitions that
+    # were already archived (detached) are not merged back.
+    op.drop_table('operation_archive_total')
+    op.execute('CREATE TABLE operation_flat (LIKE operation INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO operation_flat SELECT * FROM operation')
+    op.execute('ALTER SEQUENCE operation_id_seq OWNED BY operation_flat.id')
+    op.drop_table('operation')
+    op.rename_table('operation_flat', 'operation')
+    op.create_primary_key('operation_pkey', 'operation', ['id'])
+    op.create_foreign_key(None, 'operation', 'user', ['user_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key(None, 'operation', 'wallet', ['wallet_id'], ['id'], ondelete='CASCADE')
+    for index, columns in INDEXES.items():
+        op.create_index(index, 'operation', columns, unique=False)
+    op.create_index('ux_operation_idempotency_key', 'operation', ['idempotency_key'], unique=True, postgresql_where=IDEMPOTENCY_WHERE)
@@ -0,0 +1,27 @@
+"""wallet version
+
+Revision ID: e5a8c0d3f471
+Revises: d9b4f2e6a135
+Create Date: 2026-10-18 17:03:44.612930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8c0d3f471'
+down_revision: Union[str, None] = 'd9b4f2e6a135'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default is stored in the catalog: no table rewrite.
+    op.add_column('wallet', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('wallet', 'version')
@@ -0,0 +1,71 @@
+"""numeric money columns
+
+Revision ID: e8f3b1c6d924
+Revises: d41c7a9e3b52
+Create Date: 2026-10-18 12:20:07.551390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8f3b1c6d924'
+down_revision: Union[str, None] = 'd41c7a9e3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 10000
+
+
+def convert_batched(table: str, column: str, type_: str) -> None:
+    """
+    Rewrite ``table.column`` as ``type_`` without holding a long lock.
+
+    A shadow column is kept in sync by a trigger while existing rows are copied
+    in committed batches; only the final rename runs under an exclusive lock.
+    """
+    new = f'{column}_new'
+    op.execute(f'ALTER TABLE "{table}" ADD COLUMN {new} {type_}')
+    op.execute(
+        f'CREATE FUNCTION {table}_{new}_sync() RETURNS trigger AS $$ '
+        f'BEGIN NEW.{new} := round(NEW.{column}::numeric, 2); RETURN NEW; END $$ LANGUAGE plpgsql'
+    )
+    op.execute(
+        f'CREATE TRIGGER {table}_{new}_sync BEFORE INSERT OR UPDATE ON "{table}" '
+        f'FOR EACH ROW EXECUTE FUNCTION {table}_{new}_sync()'
+    )
+
+    with op.get_context().autocommit_block():
+        low, high = op.get_bind().execute(sa.text(f'SELECT min(id), max(id) FROM "{table}"')).one()
+        if low is not None:
+            for start in range(low, high + 1, BATCH_SIZE):
+                op.execute(
+                    f'UPDATE "{table}" SET {new} = round({column}::numeric, 2) '
+                    f'WHERE id >= {start} AND id < {start + BATCH_SIZE} AND {new} IS NULL'
+                )
+        # A validated CHECK lets SET NOT NULL below skip its full-table scan.
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT {table}_{new}_not_null CHECK ({new} IS NOT NULL) NOT VALID')
+        op.execute(f'ALTER TABLE "{table}" VALIDATE CONSTRAINT {table}_{new}_not_null')
+
+    op.execute(f'DROP TRIGGER {table}_{new}_sync ON "{table}"')
+    op.execute(f'DROP FUNCTION {table}_{new}_sync()')
+    op.drop_column(table, column)
+    op.alter_column(table, new, new_column_name=column, nullable=False)
+    op.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT {table}_{new}_not_null')
+
+
+def upgrade() -> None:
+    convert_batched('wallet', 'budget', 'NUMERIC(14, 2)')
+    convert_batched('operation', 'amount', 'NUMERIC(14, 2)')
+    # One row per wallet/category/type: small enough to rewrite in place.
+    op.alter_column('operation_aggregate', 'total', type_=sa.Numeric(precision=18, scale=2), postgresql_using='round(total::numeric, 2)')
+
+
+def downgrade() -> None:
+    op.alter_column('operation_aggregate', 'total', type_=sa.Float(precision=2))
+    op.alter_column('operation', 'amount', type_=sa.Float(precision=2))
+    op.alter_column('wallet', 'budget', type_=sa.Float(precision=2))
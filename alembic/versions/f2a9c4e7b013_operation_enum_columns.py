@@ -0,0 +1,90 @@
+"""native enum category and type_operation
+
+Revision ID: f2a9c4e7b013
+Revises: e8f3b1c6d924
+Create Date: 2026-10-18 13:05:51.207734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a9c4e7b013'
+down_revision: Union[str, None] = 'e8f3b1c6d924'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 10000
+
+CATEGORY = postgresql.ENUM(
+    'food', 'health', 'tabacco', 'entertainment', 'transportation', 'housing',
+    'education', 'savings', 'gifts', 'salary', 'freelance', 'investment',
+    name='category',
+)
+TYPE_OPERATION = postgresql.ENUM('profit', 'loss', name='type_operation')
+
+# column -> (enum type, index over the column that has to be rebuilt)
+COLUMNS = {
+    'category': ('category', 'ix_operation_user_id_category_created_at'),
+    'type_operation': ('type_operation', 'ix_operation_user_id_type_operation_created_at'),
+}
+
+
+def upgrade() -> None:
+    CATEGORY.create(op.get_bind(), checkfirst=True)
+    TYPE_OPERATION.create(op.get_bind(), checkfirst=True)
+
+    # operation is converted online: enum shadow columns are kept in sync by a
+    # trigger, backfilled in committed batches and indexed concurrently, so only
+    # the final swap takes an exclusive lock.
+    for column, (type_, _) in COLUMNS.items():
+        op.execute(f'ALTER TABLE operation ADD COLUMN {column}_new {type_}')
+    op.execute(
+        'CREATE FUNCTION operation_enum_sync() RETURNS trigger AS $$ BEGIN '
+        'NEW.category_new := NEW.category::category; '
+        'NEW.type_operation_new := NEW.type_operation::type_operation; '
+        'RETURN NEW; END $$ LANGUAGE plpgsql'
+    )
+    op.execute(
+        'CREATE TRIGGER operation_enum_sync BEFORE INSERT OR UPDATE ON operation '
+        'FOR EACH ROW EXECUTE FUNCTION operation_enum_sync()'
+    )
+
+    with op.get_context().autocommit_block():
+        low, high = op.get_bind().execute(sa.text('SELECT min(id), max(id) FROM operation')).one()
+        if low is not None:
+            for start in range(low, high + 1, BATCH_SIZE):
+                op.execute(
+                    'UPDATE operation SET category_new = category::category, '
+                    'type_operation_new = type_operation::type_operation '
+                    f'WHERE id >= {start} AND id < {start + BATCH_SIZE} AND category_new IS NULL'
+                )
+        for column, (_, index) in COLUMNS.items():
+            op.create_index(f'{index}_new', 'operation', ['user_id', f'{column}_new', 'created_at', 'id'], postgresql_concurrently=True)
+            op.execute(f'ALTER TABLE operation ADD CONSTRAINT operation_{column}_new_not_null CHECK ({column}_new IS NOT NULL) NOT VALID')
+            op.execute(f'ALTER TABLE operation VALIDATE CONSTRAINT operation_{column}_new_not_null')
+
+    op.execute('DROP TRIGGER operation_enum_sync ON operation')
+    op.execute('DROP FUNCTION operation_enum_sync()')
+    for column, (_, index) in COLUMNS.items():
+        op.drop_column('operation', column)
+        op.alter_column('operation', f'{column}_new', new_column_name=column, nullable=False)
+        op.execute(f'ALTER INDEX {index}_new RENAME TO {index}')
+        op.execute(f'ALTER TABLE operation DROP CONSTRAINT operation_{column}_new_not_null')
+
+    # One row per wallet/category/type: small enough to rewrite in place.
+    op.alter_column('operation_aggregate', 'category', type_=CATEGORY, postgresql_using='category::category')
+    op.alter_column('operation_aggregate', 'type_operation', type_=TYPE_OPERATION, postgresql_using='type_operation::type_operation')
+
+
+def downgrade() -> None:
+    for table in ('operation_aggregate', 'operation'):
+        op.alter_column(table, 'category', type_=sa.String(), postgresql_using='category::text')
+        op.alter_column(table, 'type_operation', type_=sa.String(), postgresql_using='type_operation::text')
+    TYPE_OPERATION.drop(op.get_bind())
+    CATEGORY.drop(op.get_bind())
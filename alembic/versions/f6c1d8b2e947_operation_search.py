@@ -0,0 +1,47 @@
+"""operation description, merchant and search index
+
+Revision ID: f6c1d8b2e947
+Revises: e5a8c0d3f471
+Create Date: 2026-10-18 17:46:15.228103
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c1d8b2e947'
+down_revision: Union[str, None] = 'e5a8c0d3f471'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR = "to_tsvector('simple'::regconfig, coalesce(merchant, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    # Nullable without a default: catalog-only changes.
+    op.add_column('operation', sa.Column('description', sa.String(length=500), nullable=True))
+    op.add_column('operation', sa.Column('merchant', sa.String(length=128), nullable=True))
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+
+    # CREATE INDEX CONCURRENTLY does not work on a partitioned table: create the
+    # parent index ON ONLY (invalid until every partition has one), build each
+    # partition's index concurrently and attach it. Partitions created later
+    # get the index automatically.
+    op.execute(f'CREATE INDEX IF NOT EXISTS ix_operation_search ON ONLY operation USING gin (user_id, ({SEARCH_VECTOR}))')
+    partitions = op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'operation'::regclass"
+    )).scalars().all()
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_search_idx ON {partition} USING gin (user_id, ({SEARCH_VECTOR}))')
+            op.execute(f'ALTER INDEX ix_operation_search ATTACH PARTITION {partition}_search_idx')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_operation_search', table_name='operation')
+    op.drop_column('operation', 'merchant')
+    op.drop_column('operation', 'description')
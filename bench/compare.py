@@ -0,0 +1,41 @@
+"""
+Compare two bench.run result files and flag latency regressions.
+
+    python -m bench.compare bench/results/before.json bench/results/after.json --threshold 10
+
+Exits with status 1 if any endpoint's p95 grew by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return {(result["endpoint"], result["mode"]): result for result in json.load(f)["results"]}
+
+
+def main(args) -> int:
+    before, after = load(args.before), load(args.after)
+    regressions = 0
+    print(f"{'endpoint':<28} {'mode':<5} {'p95 before':>11} {'p95 after':>10} {'change':>8} {'rps before':>11} {'rps after':>10}")
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        change = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        flag = ""
+        if change > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(
+            f"{key[0]:<28} {key[1]:<5} {old['p95_ms']:>9.2f}ms {new['p95_ms']:>8.2f}ms {change:>+7.1f}% "
+            f"{old['throughput_rps']:>11.1f} {new['throughput_rps']:>10.1f}{flag}"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 growth in percent")
+    sys.exit(main(parser.parse_args()))
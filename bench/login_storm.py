@@ -0,0 +1,84 @@
+"""
+Measure how a login storm affects unrelated endpoints.
+
+    python -m bench.login_storm --logins 400 --concurrency 50 --probe /metrics
+
+A probe endpoint is requested back to back, once on its own (baseline) and
+once while --concurrency clients keep logging in as seeded users (see
+bench.seed). Password hashing runs on the bounded pool from
+src/auth/hashing.py, so the probe's p99 should barely move; logins beyond
+AUTH_HASH_WORKERS + AUTH_HASH_QUEUE get 503 instead of queueing.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from collections import Counter
+from typing import List
+
+import httpx
+
+from bench.run import percentile
+from bench.seed import EMAIL, PASSWORD
+from src.database import engine
+from src.main import app
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event) -> List[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    print(
+        f"{name:<10} n={len(latencies):<6} p50={percentile(latencies, 50):>8.2f}ms "
+        f"p95={percentile(latencies, 95):>8.2f}ms p99={percentile(latencies, 99):>8.2f}ms max={max(latencies, default=0):>8.2f}ms"
+    )
+
+
+async def main(args) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, args.probe, stop))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        report("baseline", await task)
+
+        statuses = Counter()
+        remaining = args.logins
+
+        async def login():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                form = {"username": EMAIL.format(random.randint(1, args.users)), "password": PASSWORD}
+                response = await client.post("/auth/jwt/login", data=form)
+                statuses[response.status_code] += 1
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, args.probe, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*[login() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        report("storm", await task)
+        print(f"logins: {dict(statuses)} in {elapsed:.1f}s ({args.logins / elapsed:.1f}/s)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100, help="log in as bench-1 .. bench-N")
+    parser.add_argument("--probe", default="/metrics", help="unrelated endpoint whose latency is measured")
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(main(args))
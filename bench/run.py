@@ -0,0 +1,236 @@
+"""
+Benchmark the API in-process against a seeded database.
+
+    python -m bench.run --requests 500 --concurrency 20 --output bench/results/run.json
+    python -m bench.run --fakeredis --endpoints get_wallets get_all_operations
+
+Requests go through httpx.AsyncClient on the ASGI app, authenticated as
+random seeded users (see bench.seed). Every endpoint is measured twice:
+``cold`` evicts the user's cache entries before each request, so every
+request runs the handler and stores its result; ``warm`` primes the cache
+first. Results (p50/p95/p99 latency, throughput, errors) are written as JSON
+for bench.compare.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from sqlalchemy import select
+
+from src import cache
+from src.auth.auth import get_jwt_strategy
+from src.database import async_session_maker, engine
+from src.main import app
+from src.models.models import User, Wallet
+
+
+@dataclass
+class BenchUser:
+    id: int
+    cookie: str
+    wallet_ids: List[int]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    params: Callable[[BenchUser], Dict]
+    write: bool = False
+
+
+def _date_range(user: BenchUser) -> Dict:
+    today = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return {"date_from": (today - datetime.timedelta(days=365)).isoformat(), "date_to": today.isoformat(), "period": "month"}
+
+
+ENDPOINTS = [
+    Endpoint("get_wallets", "GET", "/wallet/get_wallets", lambda user: {}),
+    Endpoint("get_all_operations", "GET", "/operation/get_all_operations", lambda user: {"limit": 50}),
+    Endpoint("get_category_operations", "GET", "/operation/get_category_operations", lambda user: {"category": "food", "limit": 50}),
+    Endpoint("get_all_profit_operations", "GET", "/operation/get_all_profit_operations", lambda user: {"limit": 50}),
+    Endpoint("get_all_loss_operations", "GET", "/operation/get_all_loss_operations", lambda user: {"limit": 50}),
+    Endpoint("get_profit_and_loss", "GET", "/operation/get_profit_and_loss", lambda user: {"wallet_id": random.choice(user.wallet_ids)}),
+    Endpoint("get_analytics", "GET", "/operation/get_analytics", _date_range),
+    Endpoint(
+        "add_operation", "POST", "/operation/add_operation",
+        lambda user: {"wallet_id": random.choice(user.wallet_ids), "category": "food", "type_operation": "loss", "amount": "1.25"},
+        write=True,
+    ),
+]
+
+
+@dataclass
+class Result:
+    endpoint: str
+    mode: str
+    requests: int
+    concurrency: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    throughput_rps: float
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def load_users(limit: int) -> List[BenchUser]:
+    strategy = get_jwt_strategy()
+    async with async_session_maker() as session:
+        query = select(User).where(User.email.like("bench-%@example.com")).order_by(User.id).limit(limit)
+        users = (await session.execute(query)).scalars().all()
+        query = select(Wallet.user_id, Wallet.id).where(Wallet.user_id.in_([user.id for user in users]))
+        wallets: Dict[int, List[int]] = {}
+        for user_id, wallet_id in (await session.execute(query)).all():
+            wallets.setdefault(user_id, []).append(wallet_id)
+
+    return [
+        BenchUser(id=user.id, cookie=f"bonds={await strategy.write_token(user)}", wallet_ids=wallets[user.id])
+        for user in users
+        if user.id in wallets
+    ]
+
+
+async def evict(user: BenchUser) -> None:
+    await cache.invalidate(user.id, "wallets", "operations", "analytics", *[f"wallet:{wallet_id}" for wallet_id in user.wallet_ids])
+
+
+async def request(client: httpx.AsyncClient, endpoint: Endpoint, user: BenchUser) -> httpx.Response:
+    params = endpoint.params(user)
+    headers = {"Cookie": user.cookie}
+    if endpoint.method == "GET":
+        return await client.get(endpoint.path, params=params, headers=headers)
+    return await client.post(endpoint.path, json=params, headers=headers)
+
+
+async def measure(client: httpx.AsyncClient, endpoint: Endpoint, mode: str, users: List[BenchUser], total: int, concurrency: int) -> Result:
+    if mode == "warm":
+        for user in users:
+            await request(client, endpoint, user)
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            user = random.choice(users)
+            if mode == "cold":
+                await evict(user)
+            start = time.perf_counter()
+            response = await request(client, endpoint, user)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    ms = [latency * 1000 for latency in latencies]
+    return Result(
+        endpoint=endpoint.name,
+        mode=mode,
+        requests=len(ms),
+        concurrency=concurrency,
+        errors=errors,
+        p50_ms=round(percentile(ms, 50), 3),
+        p95_ms=round(percentile(ms, 95), 3),
+        p99_ms=round(percentile(ms, 99), 3),
+        mean_ms=round(sum(ms) / len(ms), 3) if ms else 0.0,
+        throughput_rps=round(len(ms) / elapsed, 1) if elapsed else 0.0,
+    )
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def init_redis(use_fakeredis: bool, url: str) -> None:
+    if use_fakeredis:
+        import fakeredis
+
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    else:
+        from redis import asyncio as aioredis
+
+        redis = aioredis.from_url(url, encoding="utf8", decode_responses=True)
+    cache.init_cache(redis, prefix="moneybase-bench")
+
+
+async def main(args) -> None:
+    await init_redis(args.fakeredis, args.redis_url)
+    users = await load_users(args.users)
+    if not users:
+        raise SystemExit("no bench users found: run python -m bench.seed first")
+
+    endpoints = [endpoint for endpoint in ENDPOINTS if not args.endpoints or endpoint.name in args.endpoints]
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in endpoints:
+            # Writes evict on every request, so only their cold numbers mean anything.
+            for mode in ("cold",) if endpoint.write else ("cold", "warm"):
+                result = await measure(client, endpoint, mode, users, args.requests, args.concurrency)
+                results.append(result)
+                print(
+                    f"{result.endpoint:<28} {result.mode:<5} p50={result.p50_ms:>8.2f}ms p95={result.p95_ms:>8.2f}ms "
+                    f"p99={result.p99_ms:>8.2f}ms {result.throughput_rps:>8.1f} req/s errors={result.errors}"
+                )
+    await engine.dispose()
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        report = {
+            "meta": {
+                "timestamp": datetime.datetime.utcnow().isoformat(),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "users": len(users),
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "redis": "fakeredis" if args.fakeredis else args.redis_url,
+            },
+            "results": [asdict(result) for result in results],
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint and mode")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=100, help="seeded users to spread requests over")
+    parser.add_argument("--endpoints", nargs="*", help="only run these endpoints")
+    parser.add_argument("--fakeredis", action="store_true", help="use an in-process fakeredis instead of Redis")
+    parser.add_argument("--redis-url", default="redis://localhost")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    asyncio.run(main(parser.parse_args()))
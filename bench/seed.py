@@ -0,0 +1,104 @@
+"""
+Seed synthetic users, wallets and operations for the benchmarks.
+
+    python -m bench.seed --users 100 --wallets 5 --operations 2000
+
+Rows are generated inside Postgres with generate_series, so millions of
+operations take seconds, not a round trip each. Seeded users share the
+password ``bench-password`` and an e-mail of the form
+``bench-<n>@example.com``; re-running with a larger --users only adds the
+missing ones. Wallet budgets, budget spending counters and operation
+aggregates are recomputed at the end.
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi_users.password import PasswordHelper
+from sqlalchemy import text
+
+from src.config import settings
+from src.database import async_session_maker
+from src.operations.aggregates import rebuild_aggregates
+
+
+PASSWORD = "bench-password"
+EMAIL = "bench-{}@example.com"
+
+
+async def seed(users: int, wallets: int, operations: int) -> None:
+    hashed_password = PasswordHelper().hash(PASSWORD)
+    async with async_session_maker() as session:
+        start = time.perf_counter()
+        result = await session.execute(
+            text(
+                'INSERT INTO "user" (username, email, hashed_password, is_active, is_superuser, is_verified) '
+                "SELECT 'bench-' || n, 'bench-' || n || '@example.com', :hashed_password, true, false, true "
+                "FROM generate_series(1, :users) AS n "
+                "WHERE NOT EXISTS (SELECT 1 FROM \"user\" WHERE email = 'bench-' || n || '@example.com') "
+                "RETURNING id"
+            ),
+            {"hashed_password": hashed_password, "users": users},
+        )
+        user_ids = result.scalars().all()
+        if not user_ids:
+            print("all bench users already exist")
+            return
+
+        await session.execute(
+            text(
+                "INSERT INTO wallet (user_id, name, budget, currency) "
+                "SELECT u, 'Wallet ' || n, 0, :currency FROM unnest(CAST(:user_ids AS integer[])) AS u, generate_series(1, :wallets) AS n"
+            ),
+            {"user_ids": user_ids, "wallets": wallets, "currency": settings.BASE_CURRENCY},
+        )
+        await session.execute(
+            text(
+                "INSERT INTO operation (user_id, wallet_id, category, type_operation, amount, currency, created_at) "
+                "SELECT w.user_id, w.id, "
+                "(enum_range(NULL::category))[1 + floor(random() * 12)::int], "
+                "CASE WHEN random() < 0.25 THEN 'profit'::type_operation ELSE 'loss'::type_operation END, "
+                "round((1 + random() * 500)::numeric, 2), w.currency, "
+                "TIMEZONE('utc', now()) - random() * interval '3 years' "
+                "FROM wallet w CROSS JOIN generate_series(1, :operations) "
+                "WHERE w.user_id = ANY(CAST(:user_ids AS integer[]))"
+            ),
+            {"user_ids": user_ids, "operations": operations},
+        )
+        await session.execute(
+            text(
+                "UPDATE wallet SET budget = totals.budget FROM ("
+                "SELECT wallet_id, SUM(CASE WHEN type_operation = 'profit' THEN amount ELSE -amount END) AS budget "
+                "FROM operation WHERE user_id = ANY(CAST(:user_ids AS integer[])) GROUP BY wallet_id"
+                ") AS totals WHERE wallet.id = totals.wallet_id"
+            ),
+            {"user_ids": user_ids},
+        )
+        # Monthly spending counters behind budget limits and alerts, as apply_spending keeps them.
+        await session.execute(
+            text(
+                "INSERT INTO budget_spending (wallet_id, category, period, user_id, spent) "
+                "SELECT wallet_id, category, date_trunc('month', created_at), user_id, SUM(amount) FROM operation "
+                "WHERE user_id = ANY(CAST(:user_ids AS integer[])) AND type_operation = 'loss' "
+                "GROUP BY wallet_id, category, date_trunc('month', created_at), user_id"
+            ),
+            {"user_ids": user_ids},
+        )
+        await rebuild_aggregates(session)
+        await session.commit()
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+
+        print(
+            f"seeded {len(user_ids)} users, {len(user_ids) * wallets} wallets, "
+            f"{len(user_ids) * wallets * operations} operations in {time.perf_counter() - start:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--wallets", type=int, default=5, help="wallets per user")
+    parser.add_argument("--operations", type=int, default=2000, help="operations per wallet")
+    args = parser.parse_args()
+    asyncio.run(seed(args.users, args.wallets, args.operations))
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark of the list response serialization paths, no database needed.
+
+    python -m bench.serialization --rows 500 --iterations 200
+
+Compares the per-row ``OperationRead.model_validate`` loop followed by
+FastAPI's jsonable_encoder + json.dumps pass with the single TypeAdapter
+validate + dump_json pass used by the list endpoints.
+"""
+import argparse
+import datetime
+import decimal
+import json
+import random
+import time
+
+from collections import namedtuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from src.config import settings
+from src.models.models import Category, TypeOperation
+from src.operations.schemas import OperationPage, OperationRead
+from src.responses import typed_response
+
+
+Row = namedtuple("Row", "id wallet_id category type_operation amount currency description merchant created_at")
+
+
+def make_rows(count: int):
+    now = datetime.datetime.utcnow()
+    return [
+        Row(
+            id=i,
+            wallet_id=random.randint(1, 10),
+            category=random.choice(list(Category)),
+            type_operation=random.choice(list(TypeOperation)),
+            amount=decimal.Decimal(random.randint(100, 100000)) / 100,
+            currency=settings.BASE_CURRENCY,
+            description=random.choice([None, "Groceries for the week"]),
+            merchant=random.choice([None, "Corner Shop"]),
+            created_at=now - datetime.timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+
+
+def per_row(rows):
+    items = [OperationRead.model_validate(row, from_attributes=True) for row in rows]
+    page = OperationPage(items=items, next_cursor=None)
+    return json.dumps(jsonable_encoder(page)).encode()
+
+
+def bulk(rows, adapter=TypeAdapter(OperationPage)):
+    return typed_response(adapter, {"items": rows, "next_cursor": None}).body
+
+
+def main(args) -> None:
+    rows = make_rows(args.rows)
+    assert json.loads(per_row(rows)) == json.loads(bulk(rows))
+    for name, fn in (("model_validate loop + jsonable_encoder", per_row), ("TypeAdapter + dump_json", bulk)):
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            fn(rows)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<40} {args.iterations / elapsed:>9.1f} responses/s  {args.rows * args.iterations / elapsed:>12.0f} rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args())
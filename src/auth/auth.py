@@ -1,15 +1,104 @@
-from fastapi_users import FastAPIUsers
+import time
+import uuid
+
+from typing import Optional
+
+import jwt
+
+from fastapi import HTTPException
+from fastapi_users import FastAPIUsers, exceptions
 from fastapi_users.authentication import AuthenticationBackend, JWTStrategy, CookieTransport
+from fastapi_users.jwt import decode_jwt, generate_jwt
 
-from src.auth.manager import get_user_manager
+from src.auth.cache import user_cache, user_resolutions
+from src.auth.manager import UserManager, get_user_manager
+from src.config import settings
 from src.models.models import User
 
 
-cookie_transport = CookieTransport(cookie_name="bonds",cookie_max_age=3600)
+cookie_transport = CookieTransport(cookie_name="bonds",cookie_max_age=settings.AUTH_TOKEN_LIFETIME)
 SECRET = "SECRET"
 
+
+class CachedJWTStrategy(JWTStrategy[User, int]):
+    """
+    JWT strategy that resolves the user without a database query when it can.
+
+    Tokens carry the user's flags; with AUTH_STATELESS the user is built from
+    them, otherwise it is served from the in-process user cache and loaded
+    only on a miss. Revocations (logout, password change, deactivation) are
+    shared through Redis and checked on every request; while Redis is down
+    the user is loaded from the database, or with AUTH_STATELESS the request
+    is rejected with 503.
+    """
+
+    async def write_token(self, user: User) -> str:
+        data = {
+            "sub": str(user.id),
+            "aud": self.token_audience,
+            "iat": time.time(),
+            "jti": uuid.uuid4().hex,
+            "email": user.email,
+            "username": user.username,
+            "is_active": user.is_active,
+            "is_superuser": user.is_superuser,
+            "is_verified": user.is_verified,
+        }
+        return generate_jwt(data, self.encode_key, self.lifetime_seconds, algorithm=self.algorithm)
+
+    async def read_token(self, token: Optional[str], user_manager: UserManager) -> Optional[User]:
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(token, self.decode_key, self.token_audience, algorithms=[self.algorithm])
+            user_id = int(data["sub"])
+        except (jwt.PyJWTError, KeyError, ValueError):
+            return None
+
+        revoked = await user_cache.is_revoked(user_id, data.get("iat"), data.get("jti"))
+        if revoked:
+            return None
+
+        if revoked is None:
+            # Revocations made by other processes are unknown while Redis is
+            # down: trust neither the claims nor the cached copy.
+            if settings.AUTH_STATELESS:
+                raise HTTPException(status_code=503, detail="Authentication is temporarily unavailable.", headers={"Retry-After": "1"})
+        elif settings.AUTH_STATELESS and "is_active" in data:
+            user_resolutions.inc(source="token")
+            return User(
+                id=user_id,
+                email=data["email"],
+                username=data["username"],
+                is_active=data["is_active"],
+                is_superuser=data["is_superuser"],
+                is_verified=data["is_verified"],
+            )
+        else:
+            user = user_cache.get(user_id)
+            if user is not None:
+                user_resolutions.inc(source="cache")
+                return user
+
+        try:
+            user = await user_manager.get(user_id)
+        except exceptions.UserNotExists:
+            return None
+        user_resolutions.inc(source="database")
+        return user_cache.set(user)
+
+    async def destroy_token(self, token: str, user: User) -> None:
+        try:
+            data = decode_jwt(token, self.decode_key, self.token_audience, algorithms=[self.algorithm])
+        except jwt.PyJWTError:
+            return
+        if "jti" in data:
+            await user_cache.revoke_token(user.id, data["jti"], data.get("exp", time.time() + (self.lifetime_seconds or 0)))
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(secret=SECRET, lifetime_seconds=3600)
+    return CachedJWTStrategy(secret=SECRET, lifetime_seconds=settings.AUTH_TOKEN_LIFETIME)
 
 auth_backend = AuthenticationBackend(
     name="jwt",
@@ -22,4 +111,4 @@ fastapi_users = FastAPIUsers[User, int](
     [auth_backend],
 )
 
-current_user = fastapi_users.current_user()
\ No newline at end of file
+current_user = fastapi_users.current_user()
@@ -0,0 +1,131 @@
+import logging
+import time
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.metrics import registry
+from src.models.models import User
+
+
+logger = logging.getLogger(__name__)
+
+user_resolutions = registry.counter(
+    "moneybase_auth_user_resolutions_total",
+    "Authenticated user lookups by source (token claims, in-process cache, database).",
+)
+
+
+class UserCache:
+    """
+    Short-TTL, size-bounded cache of authenticated users, local to the process.
+
+    ``discard`` drops a cached user so the next request reloads it;
+    ``revoke`` also rejects every token of that user issued before now, and
+    ``revoke_token`` rejects a single token until it expires.
+
+    Revocations are kept in this process and, once ``init_redis`` was called,
+    in Redis, where every process checks them on each request: they apply
+    everywhere at once. If Redis is unreachable ``is_revoked`` cannot tell
+    and says so, for the caller to fail closed. Nothing is kept past
+    ``token_lifetime``, when every token it could reject has expired anyway.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, token_lifetime: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.token_lifetime = token_lifetime
+        self._users: "OrderedDict[int, Tuple[float, User]]" = OrderedDict()
+        self._revoked_users: Dict[int, float] = {}
+        self._revoked_tokens: Dict[str, float] = {}
+        self._redis: Optional[aioredis.Redis] = None
+        self._prefix = "moneybase-auth"
+
+    def init_redis(self, redis: aioredis.Redis, prefix: str = "moneybase-auth") -> None:
+        self._redis = redis
+        self._prefix = prefix
+
+    def _user_key(self, user_id: int) -> str:
+        # {user_id} is a hash tag, so both keys of one check live on the same cluster slot.
+        return f"{self._prefix}:{{{user_id}}}:revoked"
+
+    def _token_key(self, user_id: int, jti: str) -> str:
+        return f"{self._prefix}:{{{user_id}}}:token:{jti}"
+
+    def get(self, user_id: int) -> Optional[User]:
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        expires, user = entry
+        if expires < time.monotonic():
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return user
+
+    def set(self, user: User) -> User:
+        # A detached copy: the loaded instance belongs to a request-scoped session.
+        copy = User(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            is_verified=user.is_verified,
+        )
+        self._users[user.id] = (time.monotonic() + self.ttl, copy)
+        self._users.move_to_end(user.id)
+        while len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+        return copy
+
+    def discard(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+    async def revoke(self, user_id: int) -> None:
+        self.discard(user_id)
+        now = time.time()
+        self._revoked_users = {key: at for key, at in self._revoked_users.items() if at > now - self.token_lifetime}
+        self._revoked_users[user_id] = now
+        if self._redis is not None:
+            try:
+                await self._redis.set(self._user_key(user_id), f"{now:.6f}", ex=self.token_lifetime)
+            except RedisError as e:
+                logger.error("revocation of user %s not shared, other processes accept its tokens until they expire: %s", user_id, e)
+
+    async def revoke_token(self, user_id: int, jti: str, expires_at: float) -> None:
+        now = time.time()
+        self._revoked_tokens = {key: exp for key, exp in self._revoked_tokens.items() if exp > now}
+        self._revoked_tokens[jti] = expires_at
+        if self._redis is not None and expires_at > now:
+            try:
+                await self._redis.set(self._token_key(user_id, jti), "1", exat=int(expires_at) + 1)
+            except RedisError as e:
+                logger.error("revocation of token %s not shared: %s", jti, e)
+
+    async def is_revoked(self, user_id: int, issued_at: Optional[float], jti: Optional[str]) -> Optional[bool]:
+        """True or False, or None when Redis could not be asked and only this process's revocations are known."""
+        if jti is not None and jti in self._revoked_tokens:
+            return True
+        revoked_at = self._revoked_users.get(user_id)
+        if revoked_at is not None and (issued_at is None or issued_at < revoked_at):
+            return True
+        if self._redis is None:
+            return False
+
+        try:
+            keys = [self._user_key(user_id)] + ([self._token_key(user_id, jti)] if jti is not None else [])
+            values = await self._redis.mget(keys)
+        except RedisError as e:
+            logger.warning("revocation check failed for user %s: %s", user_id, e)
+            return None
+        if len(values) > 1 and values[1] is not None:
+            return True
+        return values[0] is not None and (issued_at is None or issued_at < float(values[0]))
+
+
+user_cache = UserCache(ttl=settings.AUTH_USER_CACHE_TTL, maxsize=settings.AUTH_USER_CACHE_SIZE, token_lifetime=settings.AUTH_TOKEN_LIFETIME)
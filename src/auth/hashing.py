@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi_users.password import PasswordHelper
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+from pwdlib.hashers.bcrypt import BcryptHasher
+
+from src.config import settings
+from src.metrics import registry
+
+
+# Argon2 stays the hasher for new passwords; bcrypt hashes are still verified
+# (and rehashed to Argon2 on login), as with the fastapi-users default.
+password_helper = PasswordHelper(PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.AUTH_ARGON2_TIME_COST,
+        memory_cost=settings.AUTH_ARGON2_MEMORY_COST,
+        parallelism=settings.AUTH_ARGON2_PARALLELISM,
+    ),
+    BcryptHasher(rounds=settings.AUTH_BCRYPT_ROUNDS),
+)))
+
+# argon2-cffi and bcrypt release the GIL, so threads hash in parallel while the
+# event loop keeps serving other requests.
+_executor = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix="password-hash")
+_pending = 0
+
+hash_seconds = registry.histogram("moneybase_auth_hash_seconds", "Password hash/verify time, queueing included.")
+hash_rejected = registry.counter("moneybase_auth_hash_rejected_total", "Password hash/verify calls rejected because the pool was saturated.")
+registry.gauge("moneybase_auth_hash_pending", "Password hash/verify calls running or queued.", callback=lambda: _pending)
+
+
+async def _run(func, *args):
+    """Run ``func`` on the hashing pool, or fail with 503 when AUTH_HASH_QUEUE calls already wait."""
+    global _pending
+    if _pending >= settings.AUTH_HASH_WORKERS + settings.AUTH_HASH_QUEUE:
+        hash_rejected.inc()
+        raise HTTPException(status_code=503, detail="Too many login attempts, retry shortly.", headers={"Retry-After": "1"})
+
+    _pending += 1
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    future = _executor.submit(func, *args)
+    # Released when the pool is done with the call, not when the request is:
+    # a cancelled request's hash may still be queued or running.
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(_release, start))
+    return await asyncio.wrap_future(future)
+
+
+def _release(start: float) -> None:
+    global _pending
+    _pending -= 1
+    hash_seconds.observe(time.perf_counter() - start)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(password_helper.hash, password)
+
+
+async def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run(password_helper.verify_and_update, password, hashed_password)
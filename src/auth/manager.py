@@ -1,20 +1,40 @@
-from typing import Optional
+import logging
+
+from typing import Any, Dict, Optional
 
 from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users import BaseUserManager, IntegerIDMixin, schemas, models, exceptions
 
-from src.models.models import User
+from src import outbox
+from src.models.models import OutboxEvent, User
+from src.auth.cache import user_cache
+from src.auth.hashing import hash_password, password_helper, verify_and_update
 from src.auth.utils import get_user_db
 
 SECRET = "SECRET"
 
+logger = logging.getLogger(__name__)
+
 
 class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
     reset_password_token_secret = SECRET
     verification_token_secret = SECRET
 
     async def on_after_register(self, user: User, request: Optional[Request] = None):
-        print(f"User {user.id} has registered.")
+        # The user row is already committed by fastapi-users.
+        await outbox.emit(self.user_db.session, "user_registered", user.id)
+        await self.user_db.session.commit()
+        await outbox.committed(self.user_db.session)
+
+    async def on_after_update(self, user: User, update_dict: Dict[str, Any], request: Optional[Request] = None):
+        if "password" in update_dict or update_dict.get("is_active") is False:
+            await user_cache.revoke(user.id)
+        else:
+            user_cache.discard(user.id)
+
+    async def on_after_delete(self, user: User, request: Optional[Request] = None):
+        await user_cache.revoke(user.id)
 
     async def create(
         self,
@@ -47,15 +67,45 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
             else user_create.create_update_dict_superuser()
         )
         password = user_dict.pop("password")
-        user_dict["hashed_password"] = self.password_helper.hash(password)
-
+        user_dict["hashed_password"] = await hash_password(password)
 
         created_user = await self.user_db.create(user_dict)
 
         await self.on_after_register(created_user, request)
 
         return created_user
-    
+
+    async def authenticate(self, credentials: OAuth2PasswordRequestForm) -> Optional[models.UP]:
+        """Same as fastapi-users, with hashing moved off the event loop (src/auth/hashing.py)."""
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Hash anyway so unknown e-mails take as long as wrong passwords.
+            await hash_password(credentials.password)
+            return None
+
+        verified, updated_password_hash = await verify_and_update(credentials.password, user.hashed_password)
+        if not verified:
+            return None
+        if updated_password_hash is not None:
+            await self.user_db.update(user, {"hashed_password": updated_password_hash})
+
+        return user
+
+    async def _update(self, user: models.UP, update_dict: Dict[str, Any]) -> models.UP:
+        password = update_dict.get("password")
+        if password is not None:
+            await self.validate_password(password, user)
+            # The base class passes unknown fields through to the database as they are.
+            update_dict = {key: value for key, value in update_dict.items() if key != "password"}
+            update_dict["hashed_password"] = await hash_password(password)
+        return await super()._update(user, update_dict)
+
+
+@outbox.handler("user_registered")
+async def user_registered(event: OutboxEvent):
+    logger.info("User %s has registered.", event.user_id)
+
 
 async def get_user_manager(user_db=Depends(get_user_db)):
-    yield UserManager(user_db)
\ No newline at end of file
+    yield UserManager(user_db, password_helper)
\ No newline at end of file
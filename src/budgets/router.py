@@ -0,0 +1,115 @@
+import datetime
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import TypeAdapter
+from sqlalchemy import and_, delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import outbox
+from src.auth.auth import current_user
+from src.budgets.schemas import BudgetAlertPage, BudgetLimitCreate, BudgetLimitRead
+from src.budgets.spending import crossed, raise_alerts
+from src.cache import cached
+from src.database import get_async_session
+from src.models.models import BudgetAlert, BudgetLimit, BudgetSpending, Category, User, Wallet
+from src.operations.partitions import month_start
+from src.pagination import keyset, page
+from src.responses import typed_response
+
+
+router = APIRouter(
+    prefix="/budget",
+    tags=["Budgets"]
+)
+
+
+@router.post("/set_limit", response_model=BudgetLimitRead)
+async def set_limit(data_limit: BudgetLimitCreate, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    query = select(Wallet.id).where(Wallet.id == data_limit.wallet_id, Wallet.user_id == user.id)
+    if (await session.execute(query)).scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Wallet not found.")
+
+    data = data_limit.dict()
+    data["user_id"] = user.id
+    stmt = pg_insert(BudgetLimit).values(data)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BudgetLimit.wallet_id, BudgetLimit.category],
+        set_={"amount": stmt.excluded.amount, "updated_at": text("TIMEZONE('utc', now())")},
+    )
+    await session.execute(stmt)
+
+    # A new or lowered limit may already be exceeded this month: alert now rather than on the next operation.
+    period = month_start(datetime.datetime.utcnow())
+    query = select(BudgetSpending.spent).where(
+        BudgetSpending.wallet_id == data_limit.wallet_id, BudgetSpending.category == data_limit.category, BudgetSpending.period == period
+    )
+    spent = (await session.execute(query)).scalar_one_or_none() or 0
+    await raise_alerts(session, [
+        {
+            "user_id": user.id,
+            "wallet_id": data_limit.wallet_id,
+            "category": data_limit.category,
+            "period": period,
+            "threshold": threshold,
+            "limit_amount": data_limit.amount,
+            "spent": spent,
+        }
+        for threshold in crossed(data_limit.amount, 0, spent)
+    ])
+    await outbox.emit_invalidation(session, user.id, ["budgets"])
+    await session.commit()
+    await outbox.committed(session)
+
+    return BudgetLimitRead(spent=spent, **data_limit.model_dump())
+
+
+_limits_adapter = TypeAdapter(List[BudgetLimitRead])
+
+@router.get("/get_limits", response_model=List[BudgetLimitRead])
+@cached(expire=120, scopes=["budgets"])
+async def get_limits(user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    period = month_start(datetime.datetime.utcnow())
+    query = select(
+        BudgetLimit.wallet_id,
+        BudgetLimit.category,
+        BudgetLimit.amount,
+        func.coalesce(BudgetSpending.spent, 0).label("spent"),
+    ).outerjoin(BudgetSpending, and_(
+        BudgetSpending.wallet_id == BudgetLimit.wallet_id,
+        BudgetSpending.category == BudgetLimit.category,
+        BudgetSpending.period == period,
+    )).where(BudgetLimit.user_id == user.id).order_by(BudgetLimit.wallet_id, BudgetLimit.category)
+    res = await session.execute(query)
+
+    return typed_response(_limits_adapter, res.all())
+
+
+@router.post("/delete_limit")
+async def delete_limit(wallet_id: int, category: Category, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    # Alerts already raised under the limit are kept.
+    stmt = delete(BudgetLimit).where(BudgetLimit.wallet_id == wallet_id, BudgetLimit.category == category, BudgetLimit.user_id == user.id).returning(BudgetLimit.wallet_id)
+    result = await session.execute(stmt)
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Budget limit not found.")
+    await outbox.emit_invalidation(session, user.id, ["budgets"])
+    await session.commit()
+    await outbox.committed(session)
+
+    return {"status": "success"}
+
+
+_alerts_adapter = TypeAdapter(BudgetAlertPage)
+
+@router.get("/get_alerts", response_model=BudgetAlertPage)
+@cached(expire=120, scopes=["budgets"])
+async def get_alerts(wallet_id: Optional[int] = None, limit: int = Query(default=20, ge=1, le=500), cursor: Optional[str] = None, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    query = select(BudgetAlert).where(BudgetAlert.user_id == user.id)
+    if wallet_id is not None:
+        query = query.where(BudgetAlert.wallet_id == wallet_id)
+    res = await session.execute(keyset(query, BudgetAlert.created_at, BudgetAlert.id, cursor, limit))
+    rows, next_cursor = page(res.scalars().all(), limit)
+
+    return typed_response(_alerts_adapter, {"items": rows, "next_cursor": next_cursor})
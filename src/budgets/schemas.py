@@ -0,0 +1,35 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Annotated, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.models.models import Category
+from src.models.schemas import Money
+
+
+class BudgetLimitCreate(BaseModel):
+    wallet_id: int
+    category: Category
+    amount: Annotated[Money, Field(gt=0)]
+
+
+class BudgetLimitRead(BudgetLimitCreate):
+    # Loss operations of the current month (UTC) so far.
+    spent: Decimal
+
+
+class BudgetAlertRead(BaseModel):
+    id: int
+    wallet_id: int
+    category: Category
+    period: datetime
+    threshold: int
+    limit_amount: Money
+    spent: Decimal
+    created_at: datetime
+
+
+class BudgetAlertPage(BaseModel):
+    items: List[BudgetAlertRead]
+    next_cursor: Optional[str]
@@ -0,0 +1,86 @@
+import datetime
+import decimal
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from sqlalchemy import and_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.metrics import registry
+from src.models.models import BudgetAlert, BudgetLimit, BudgetSpending, Category, TypeOperation
+from src.operations.partitions import month_start
+
+
+alerts_raised = registry.counter("moneybase_budget_alerts_total", "Budget alerts raised by spending crossing a threshold.")
+
+
+def crossed(limit: decimal.Decimal, previous: decimal.Decimal, spent: decimal.Decimal) -> List[int]:
+    """The BUDGET_ALERT_THRESHOLDS (percent of ``limit``) that spending passed going from ``previous`` to ``spent``."""
+    return [threshold for threshold in settings.BUDGET_ALERT_THRESHOLDS if previous < limit * threshold / 100 <= spent]
+
+
+async def raise_alerts(session: AsyncSession, alerts: List[dict]) -> int:
+    """Insert alerts, skipping thresholds already alerted this month; returns how many are new."""
+    if not alerts:
+        return 0
+    stmt = pg_insert(BudgetAlert).on_conflict_do_nothing(
+        index_elements=[BudgetAlert.wallet_id, BudgetAlert.category, BudgetAlert.period, BudgetAlert.threshold],
+    ).returning(BudgetAlert.id)
+    raised = len((await session.execute(stmt, alerts)).all())
+    alerts_raised.inc(raised)
+    return raised
+
+
+async def apply_spending(session: AsyncSession, operations: Iterable[Mapping], sign: int = 1) -> None:
+    """
+    Add loss operations to the monthly spending counters and alert on the limits they cross.
+
+    Operations are mappings with user_id, wallet_id, category, type_operation,
+    amount and created_at; ``sign=-1`` takes deleted operations back out. The
+    counters are upserted in one statement that also returns the matching
+    limits, so the cost does not depend on how much was spent in the month.
+    Runs in the caller's transaction.
+    """
+    deltas: Dict[Tuple[int, Category, datetime.datetime], decimal.Decimal] = defaultdict(decimal.Decimal)
+    users = {}
+    for operation in operations:
+        if operation["type_operation"] != TypeOperation.loss:
+            continue
+        key = (operation["wallet_id"], operation["category"], month_start(operation["created_at"]))
+        deltas[key] += sign * operation["amount"]
+        users[key] = operation["user_id"]
+    if not deltas:
+        return
+
+    rows = [
+        {"wallet_id": key[0], "category": key[1], "period": key[2], "user_id": users[key], "spent": delta}
+        for key, delta in deltas.items()
+    ]
+    stmt = pg_insert(BudgetSpending).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BudgetSpending.wallet_id, BudgetSpending.category, BudgetSpending.period],
+        set_={"spent": BudgetSpending.spent + stmt.excluded.spent, "updated_at": text("TIMEZONE('utc', now())")},
+    ).returning(BudgetSpending.wallet_id, BudgetSpending.category, BudgetSpending.period, BudgetSpending.user_id, BudgetSpending.spent)
+    # The upsert runs in full; the join only picks the counters that have a limit.
+    spending = stmt.cte("spending")
+    query = select(spending, BudgetLimit.amount.label("limit_amount")).join(
+        BudgetLimit, and_(BudgetLimit.wallet_id == spending.c.wallet_id, BudgetLimit.category == spending.c.category)
+    )
+
+    alerts = []
+    for row in await session.execute(query):
+        delta = deltas[(row.wallet_id, row.category, row.period)]
+        for threshold in crossed(row.limit_amount, row.spent - delta, row.spent):
+            alerts.append({
+                "user_id": row.user_id,
+                "wallet_id": row.wallet_id,
+                "category": row.category,
+                "period": row.period,
+                "threshold": threshold,
+                "limit_amount": row.limit_amount,
+                "spent": row.spent,
+            })
+    await raise_alerts(session, alerts)
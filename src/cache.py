@@ -0,0 +1,280 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import random
+import time
+
+from typing import Callable, Dict, Iterable, Optional, Set, Union
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import async_session_maker
+from src.instrumentation import current_stats
+from src.metrics import registry
+from src.responses import RawJSONResponse
+
+
+logger = logging.getLogger(__name__)
+
+cache_hits = registry.counter("moneybase_cache_hits_total", "Cached endpoint lookups served from Redis.")
+cache_misses = registry.counter("moneybase_cache_misses_total", "Cached endpoint lookups that ran the handler.")
+cache_stale = registry.counter("moneybase_cache_stale_total", "Expired entries served while a refresh runs.")
+cache_coalesced = registry.counter("moneybase_cache_coalesced_total", "Misses that waited for another computation of the same key.")
+cache_evictions = registry.counter("moneybase_cache_evictions_total", "Cache entries evicted by writes.")
+
+# Every entry is registered in one tag set per scope it depends on, so a write
+# evicts exactly the entries of that user/scope without scanning the keyspace.
+_INVALIDATE = """
+local evicted = 0
+for _, tag in ipairs(KEYS) do
+    local keys = redis.call('SMEMBERS', tag)
+    for i = 1, #keys, 500 do
+        evicted = evicted + redis.call('UNLINK', unpack(keys, i, math.min(i + 499, #keys)))
+    end
+    redis.call('UNLINK', tag)
+end
+return evicted
+"""
+
+# Only delete the lock if it is still ours.
+_UNLOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_redis: Optional[aioredis.Redis] = None
+_invalidate_script = None
+_unlock_script = None
+_prefix = "moneybase-cache"
+
+# key -> computation in progress in this process; later misses await it.
+_inflight: Dict[str, asyncio.Future] = {}
+# Background refreshes, referenced until done so they are not garbage collected.
+_refreshes: Set[asyncio.Task] = set()
+
+
+def init_cache(redis: aioredis.Redis, prefix: str = "moneybase-cache") -> None:
+    global _redis, _invalidate_script, _unlock_script, _prefix
+    _redis = redis
+    _invalidate_script = redis.register_script(_INVALIDATE)
+    _unlock_script = redis.register_script(_UNLOCK)
+    _prefix = prefix
+
+
+def _tag(user_id: int, scope: str) -> str:
+    # {user_id} is a hash tag: all keys of one user live on the same cluster slot.
+    return f"{_prefix}:{{{user_id}}}:tag:{scope}"
+
+
+def _key(user_id: int, name: str, kwargs: dict) -> str:
+    params = {k: v for k, v in kwargs.items() if k != "user" and not isinstance(v, AsyncSession)}
+    digest = hashlib.md5(json.dumps(jsonable_encoder(params), sort_keys=True).encode()).hexdigest()
+    return f"{_prefix}:{{{user_id}}}:{name}:{digest}"
+
+
+def _unpack(value: str):
+    """Split a stored entry into (fresh until, body); entries are ``"<fresh until>:<body>"``."""
+    fresh_until, _, body = value.partition(":")
+    try:
+        return float(fresh_until), body
+    except ValueError:
+        return None, None
+
+
+def cached(expire: int, scopes: Union[Iterable[str], Callable[..., Iterable[str]]], stale: Optional[int] = None):
+    """
+    Cache a user-scoped endpoint in Redis.
+
+    The endpoint must take the authenticated user as ``user``. ``scopes`` are
+    formatted with the endpoint kwargs (e.g. ``"wallet:{wallet_id}"``), or
+    computed by calling ``scopes(**kwargs)``, and name the tag sets that
+    ``invalidate`` evicts. Hits return the stored JSON as-is.
+
+    Entries are fresh for ``expire`` seconds (CACHE_TTLS overrides it per
+    endpoint name), shortened by up to CACHE_JITTER so entries written together
+    do not expire together. For ``stale`` more seconds (default ``expire``) an
+    expired entry is still served while a single background refresh runs.
+    Writers evict right after their commit (``outbox.committed``) and the
+    outbox event retries a failed eviction, so while Redis is unreachable an
+    entry can outlive its data until the event is delivered or it expires.
+    Concurrent misses of one key run the handler once per process, and once
+    across processes with CACHE_LOCK.
+    """
+    if not callable(scopes):
+        templates = tuple(scopes)
+        scopes = lambda **kwargs: [template.format(**kwargs) for template in templates]
+
+    def wrapper(func):
+        name = func.__name__
+        ttl = settings.CACHE_TTLS.get(name, expire)
+        stale_ttl = ttl if stale is None else stale
+
+        async def store(user_id: int, key: str, body: str, kwargs: dict) -> None:
+            fresh_until = time.time() + ttl * (1 - random.random() * settings.CACHE_JITTER)
+            try:
+                async with _redis.pipeline(transaction=False) as pipe:
+                    pipe.set(key, f"{fresh_until:.3f}:{body}", ex=ttl + stale_ttl)
+                    for scope in scopes(**kwargs):
+                        tag = _tag(user_id, scope)
+                        pipe.sadd(tag, key)
+                        pipe.expire(tag, ttl + stale_ttl)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning("cache store failed for %s: %s", key, e)
+
+        async def compute(user_id: int, key: str, args, kwargs):
+            """Run the handler and store its result; returns (result, stored body or None)."""
+            token = None
+            if settings.CACHE_LOCK:
+                token = await _lock(key)
+                if token is None:
+                    # Another process is computing this key: wait for its entry.
+                    body = await _wait_for(key)
+                    if body is not None:
+                        return RawJSONResponse(content=body), body
+            try:
+                result = await func(*args, **kwargs)
+                if isinstance(result, Response):
+                    if result.status_code != 200:
+                        return result, None
+                    body = result.body.decode()
+                else:
+                    body = json.dumps(jsonable_encoder(result))
+                await store(user_id, key, body, kwargs)
+                return result, body
+            finally:
+                if token is not None:
+                    await _unlock(key, token)
+
+        async def single_flight(user_id: int, key: str, args, kwargs):
+            future = _inflight.get(key)
+            if future is not None:
+                cache_coalesced.inc(endpoint=name)
+                try:
+                    body = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    if not future.cancelled():
+                        raise
+                    body = None
+                if body is not None:
+                    return RawJSONResponse(content=body)
+                return await func(*args, **kwargs)
+
+            future = asyncio.get_running_loop().create_future()
+            _inflight[key] = future
+            try:
+                result, body = await compute(user_id, key, args, kwargs)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                # Retrieved here so an exception nobody waited for is not reported as lost.
+                future.exception()
+                raise
+            else:
+                future.set_result(body)
+                return result
+            finally:
+                _inflight.pop(key, None)
+
+        async def refresh(user_id: int, key: str, kwargs: dict) -> None:
+            # The request's session is closed by the time this runs.
+            try:
+                async with async_session_maker() as session:
+                    kwargs = {k: session if isinstance(v, AsyncSession) else v for k, v in kwargs.items()}
+                    await single_flight(user_id, key, (), kwargs)
+            except Exception:
+                logger.exception("cache refresh failed for %s", key)
+
+        @functools.wraps(func)
+        async def inner(*args, **kwargs):
+            if _redis is None:
+                return await func(*args, **kwargs)
+
+            user_id = kwargs["user"].id
+            key = _key(user_id, name, kwargs)
+            try:
+                value = await _redis.get(key)
+            except RedisError as e:
+                logger.warning("cache lookup failed for %s: %s", key, e)
+                return await func(*args, **kwargs)
+
+            stats = current_stats()
+            fresh_until, body = _unpack(value) if value is not None else (None, None)
+            if body is not None:
+                cache_hits.inc(endpoint=name)
+                if stats is not None:
+                    stats.cache_hits += 1
+                if fresh_until < time.time() and key not in _inflight:
+                    cache_stale.inc(endpoint=name)
+                    task = asyncio.create_task(refresh(user_id, key, kwargs))
+                    _refreshes.add(task)
+                    task.add_done_callback(_refreshes.discard)
+                return RawJSONResponse(content=body)
+
+            cache_misses.inc(endpoint=name)
+            if stats is not None:
+                stats.cache_misses += 1
+            return await single_flight(user_id, key, args, kwargs)
+
+        return inner
+
+    return wrapper
+
+
+async def _lock(key: str) -> Optional[str]:
+    token = f"{random.getrandbits(64):x}"
+    try:
+        if await _redis.set(f"{key}:lock", token, nx=True, px=int(settings.CACHE_LOCK_TIMEOUT * 1000)):
+            return token
+    except RedisError as e:
+        logger.warning("cache lock failed for %s: %s", key, e)
+        return token
+    return None
+
+
+async def _unlock(key: str, token: str) -> None:
+    try:
+        await _unlock_script(keys=[f"{key}:lock"], args=[token])
+    except RedisError as e:
+        logger.warning("cache unlock failed for %s: %s", key, e)
+
+
+async def _wait_for(key: str) -> Optional[str]:
+    """Poll for the entry another process is computing, for at most CACHE_LOCK_TIMEOUT."""
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        try:
+            value = await _redis.get(key)
+        except RedisError:
+            return None
+        if value is not None:
+            return _unpack(value)[1]
+    return None
+
+
+async def evict(user_id: int, *scopes: str) -> None:
+    """Evict every cached entry of ``user_id`` registered under ``scopes``; Redis errors propagate."""
+    if _redis is None or not scopes:
+        return
+    evicted = await _invalidate_script(keys=[_tag(user_id, scope) for scope in scopes])
+    cache_evictions.inc(evicted)
+
+
+async def invalidate(user_id: int, *scopes: str) -> None:
+    """Best-effort ``evict``: a Redis failure is logged and the entries expire on their own."""
+    try:
+        await evict(user_id, *scopes)
+    except RedisError as e:
+        logger.warning("cache invalidation failed for user %s: %s", user_id, e)
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import csv
+import decimal
+import re
+import time
+
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import case, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import async_session_maker
+from src.metrics import registry
+from src.models.models import ExchangeRate
+
+
+rate_reloads = registry.counter("moneybase_exchange_rate_reloads_total", "Exchange rate reloads after a new version was loaded.")
+
+_CURRENCY = re.compile(r"^[A-Z]{3}$")
+
+# currency -> units of BASE_CURRENCY per unit, as of _version.
+_rates: Dict[str, decimal.Decimal] = {settings.BASE_CURRENCY: decimal.Decimal(1)}
+_version: Optional[int] = None
+_checked_at = float("-inf")
+_lock = asyncio.Lock()
+
+
+async def get_rates(session: AsyncSession) -> Dict[str, decimal.Decimal]:
+    """
+    The exchange rates to BASE_CURRENCY, cached in this process.
+
+    The cache is trusted for EXCHANGE_RATE_CHECK_SECONDS. After that, one
+    request reads the highest version in exchange_rate, and all rates are
+    reloaded only when a load has happened since. BASE_CURRENCY is always 1.
+    """
+    global _rates, _version, _checked_at
+    if time.monotonic() - _checked_at < settings.EXCHANGE_RATE_CHECK_SECONDS:
+        return _rates
+    async with _lock:
+        if time.monotonic() - _checked_at >= settings.EXCHANGE_RATE_CHECK_SECONDS:
+            version = (await session.execute(select(func.max(ExchangeRate.version)))).scalar_one()
+            if version != _version:
+                rates = dict((await session.execute(select(ExchangeRate.currency, ExchangeRate.rate))).all())
+                rates[settings.BASE_CURRENCY] = decimal.Decimal(1)
+                _rates, _version = rates, version
+                rate_reloads.inc()
+            _checked_at = time.monotonic()
+    return _rates
+
+
+def invalidate_rates() -> None:
+    """Make the next get_rates check the version, e.g. after loading rates from this process."""
+    global _checked_at
+    _checked_at = float("-inf")
+
+
+def convert(amount, currency, rates: Dict[str, decimal.Decimal], target: str):
+    """
+    SQL expression for ``amount`` (in the ``currency`` column) in ``target``.
+
+    The rates are inlined as one CASE over ``currency``, so the conversion costs
+    no join; it is NULL for a currency without a rate.
+    """
+    if target not in rates:
+        raise HTTPException(status_code=422, detail=f"No exchange rate for {target}.")
+    return amount * case({code: rate / rates[target] for code, rate in rates.items()}, value=currency)
+
+
+def check_missing(currencies: Optional[List[str]]) -> None:
+    """Fail when a consolidated query met currencies that have no rate (their amounts were NULL)."""
+    if currencies:
+        raise HTTPException(status_code=422, detail=f"No exchange rate for {', '.join(sorted(currencies))}.")
+
+
+async def load_rates(session: AsyncSession, rates: Dict[str, decimal.Decimal]) -> int:
+    """Upsert ``rates`` under a new version, which every process picks up at its next check; commits."""
+    # Serializes loads, so versions are not handed out twice.
+    await session.execute(text("LOCK TABLE exchange_rate IN EXCLUSIVE MODE"))
+    version = (await session.execute(select(func.coalesce(func.max(ExchangeRate.version), 0) + 1))).scalar_one()
+    stmt = pg_insert(ExchangeRate)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ExchangeRate.currency],
+        set_={"rate": stmt.excluded.rate, "version": stmt.excluded.version, "updated_at": text("TIMEZONE('utc', now())")},
+    )
+    await session.execute(stmt, [{"currency": code, "rate": rate, "version": version} for code, rate in rates.items()])
+    await session.commit()
+    invalidate_rates()
+    return version
+
+
+def read_rates(path: str) -> Dict[str, decimal.Decimal]:
+    """Read a CSV file with ``currency,rate`` columns: units of BASE_CURRENCY per unit of currency."""
+    rates = {}
+    with open(path, newline="") as file:
+        for number, record in enumerate(csv.DictReader(file), start=2):
+            code = (record.get("currency") or "").strip().upper()
+            try:
+                rate = decimal.Decimal((record.get("rate") or "").strip())
+            except decimal.InvalidOperation:
+                rate = None
+            if not _CURRENCY.match(code) or rate is None or not rate.is_finite() or rate <= 0:
+                raise ValueError(f"line {number}: expected a currency code and a positive rate, got {record}")
+            rates[code] = rate
+    return rates
+
+
+async def main(path: str) -> None:
+    rates = read_rates(path)
+    async with async_session_maker() as session:
+        version = await load_rates(session, rates)
+    print(f"loaded {len(rates)} exchange rates as version {version}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load exchange rates from a CSV file (currency,rate per unit in BASE_CURRENCY).")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    asyncio.run(main(args.path))
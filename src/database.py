@@ -1,9 +1,14 @@
+import time
+import uuid
+
 from typing import AsyncGenerator
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.config import settings
+from src.metrics import registry
 
 DATABASE_URL = settings.DATABASE_URL_asyncpg
 
@@ -12,9 +17,52 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(DATABASE_URL)
+pool_wait_seconds = registry.histogram(
+    "moneybase_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start)
+
+
+def _connect_args() -> dict:
+    if settings.DB_PGBOUNCER:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)},
+    }
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=_connect_args(),
+)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+registry.gauge("moneybase_db_pool_size", "Configured pool size.", callback=lambda: engine.pool.size())
+registry.gauge("moneybase_db_pool_checked_out", "Connections currently in use.", callback=lambda: engine.pool.checkedout())
+registry.gauge("moneybase_db_pool_overflow", "Connections open beyond pool_size.", callback=lambda: max(engine.pool.overflow(), 0))
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
@@ -0,0 +1,118 @@
+import contextvars
+import logging
+import time
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import settings
+from src.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+request_latency = registry.histogram(
+    "moneybase_request_seconds",
+    "Request latency by route.",
+)
+request_sql_statements = registry.histogram(
+    "moneybase_request_sql_statements",
+    "SQL statements executed per request.",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+request_sql_seconds = registry.histogram(
+    "moneybase_request_sql_seconds",
+    "Time spent in SQL statements per request.",
+)
+sql_statements = registry.counter("moneybase_sql_statements_total", "SQL statements executed.")
+
+
+@dataclass
+class RequestStats:
+    queries: List[Tuple[str, float]] = field(default_factory=list)
+    sql_seconds: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    sql_statements.inc()
+    # Engine events run in SQLAlchemy's greenlet, which shares the request's context.
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries.append((statement, elapsed))
+        stats.sql_seconds += elapsed
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware recording per-route latency, SQL statement counts and SQL time.
+
+    Requests slower than SLOW_REQUEST_SECONDS are logged with their statements,
+    which makes N+1 query patterns visible.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            # The router stores the matched route in the scope; raw paths would explode label cardinality.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            request_latency.observe(elapsed, method=method, route=route)
+            request_sql_statements.observe(len(stats.queries), method=method, route=route)
+            request_sql_seconds.observe(stats.sql_seconds, method=method, route=route)
+
+            if elapsed >= settings.SLOW_REQUEST_SECONDS:
+                logger.warning(
+                    "slow request %s %s -> %s in %.3fs: %d statements (%.3fs), cache %d hit / %d miss%s",
+                    method,
+                    route,
+                    status,
+                    elapsed,
+                    len(stats.queries),
+                    stats.sql_seconds,
+                    stats.cache_hits,
+                    stats.cache_misses,
+                    "".join(f"\n  {duration * 1000:8.2f}ms  {' '.join(statement.split())[:500]}" for statement, duration in stats.queries),
+                )
@@ -1,19 +1,36 @@
-from fastapi import FastAPI
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
+import asyncio
+import logging
 
+from fastapi import FastAPI
 from redis import asyncio as aioredis
 
 from src.auth.auth import auth_backend, fastapi_users
 from src.auth.schemas import UserCreate, UserRead
+from src.auth.cache import user_cache
+from src.cache import init_cache
+from src.config import settings
+from src.database import engine
+from src.instrumentation import InstrumentationMiddleware, instrument_engine
+from src.metrics import router as router_metrics
 
 from src.wallet.router import router as router_wallet
 from src.operations.router import router as router_operation
+from src.recurring.router import router as router_recurring
+from src.transfers.router import router as router_transfer
+from src.budgets.router import router as router_budget
+from src.operations.partitions import maintain_partitions
+from src.outbox import run_consumer
+from src.recurring.scheduler import run_scheduler
+
+logging.basicConfig(level=settings.LOG_LEVEL)
 
 app = FastAPI(
     title="MoneyBase"
 )
 
+app.add_middleware(InstrumentationMiddleware)
+instrument_engine(engine)
+
 app.include_router(
     fastapi_users.get_auth_router(auth_backend),
     prefix="/auth/jwt",
@@ -28,8 +45,23 @@ app.include_router(
 
 app.include_router(router_wallet)
 app.include_router(router_operation)
+app.include_router(router_recurring)
+app.include_router(router_transfer)
+app.include_router(router_budget)
+app.include_router(router_metrics)
 
 @app.on_event("startup")
 async def startup_event():
     redis = aioredis.from_url("redis://localhost", encoding="utf8", decode_responses=True)
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    init_cache(redis, prefix="moneybase-cache")
+    user_cache.init_redis(redis, prefix="moneybase-auth")
+    # Every API process consumes the outbox, so its own writes are delivered right after commit.
+    app.state.background = [asyncio.create_task(run_consumer())]
+    if settings.WORKER_IN_PROCESS:
+        app.state.background += [asyncio.create_task(run_scheduler()), asyncio.create_task(maintain_partitions())]
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in app.state.background:
+        task.cancel()
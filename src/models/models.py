@@ -1,17 +1,25 @@
 import datetime
+import decimal
 import enum
 
-from typing import Annotated, Dict, List
+from typing import Annotated, List, Optional
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
 
-from sqlalchemy import Boolean, Float, String, ForeignKey, text
+from sqlalchemy import BigInteger, Boolean, CheckConstraint, Enum, Numeric, String, ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from src.config import settings
 from src.database import Base
 
 
 intpk = Annotated[int, mapped_column(primary_key=True, autoincrement=True)]
 
+money = Annotated[decimal.Decimal, mapped_column(Numeric(precision=14, scale=2))]
+
+# ISO 4217 code; fixed when the wallet is created.
+currency = Annotated[str, mapped_column(String(length=3), nullable=False, default=settings.BASE_CURRENCY)]
+
 created_at = Annotated[datetime.datetime, mapped_column(server_default=text("TIMEZONE('utc', now())"))]
 updated_at = Annotated[datetime.datetime, mapped_column(
         server_default=text("TIMEZONE('utc', now())"),
@@ -37,6 +45,20 @@ class TypeOperation(enum.Enum):
     loss = "loss"
 
 
+class Interval(enum.Enum):
+    daily = "daily"
+    weekly = "weekly"
+    monthly = "monthly"
+
+
+category_enum = Enum(Category, name="category")
+type_operation_enum = Enum(TypeOperation, name="type_operation")
+interval_enum = Enum(Interval, name="recurring_interval")
+
+# Must stay identical to the ix_operation_search expression for the planner to use the index.
+OPERATION_SEARCH_VECTOR = "to_tsvector('simple'::regconfig, coalesce(merchant, '') || ' ' || coalesce(description, ''))"
+
+
 class User(SQLAlchemyBaseUserTable[int], Base):
     __tablename__ = "user"
 
@@ -69,9 +91,12 @@ class Wallet(Base):
     __tablename__ = "wallet"
 
     id: Mapped[intpk]
-    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), index=True)
     name: Mapped[str] = mapped_column(String(length=64), nullable=False, default="MyWallet")
-    budget: Mapped[float] = mapped_column(Float(precision=2), nullable=False, default=0)
+    budget: Mapped[money] = mapped_column(nullable=False, default=0)
+    currency: Mapped[currency]
+    # Bumped by every budget change; change_wallet only applies on a matching version.
+    version: Mapped[int] = mapped_column(nullable=False, default=1, server_default=text("1"))
     created_at: Mapped[created_at]
     updated_at: Mapped[updated_at]
 
@@ -86,13 +111,21 @@ class Wallet(Base):
 class Operation(Base):
     __tablename__ = "operation"
 
+    # Range-partitioned by month on created_at (see src/operations/partitions.py),
+    # so the partition key is part of the primary key.
     id: Mapped[intpk]
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), nullable=False)
-    category: Mapped[Category] = mapped_column(String, nullable=False)
-    type_operation: Mapped[TypeOperation] = mapped_column(String, nullable=False)
-    amount: Mapped[float] = mapped_column(Float(precision=2), default=0, nullable=False)
-    created_at: Mapped[created_at]
+    category: Mapped[Category] = mapped_column(category_enum, nullable=False)
+    type_operation: Mapped[TypeOperation] = mapped_column(type_operation_enum, nullable=False)
+    amount: Mapped[money] = mapped_column(default=0, nullable=False)
+    # The wallet's currency, copied so conversions over operations need no join.
+    currency: Mapped[currency]
+    description: Mapped[Optional[str]] = mapped_column(String(length=500), nullable=True)
+    merchant: Mapped[Optional[str]] = mapped_column(String(length=128), nullable=True)
+    # Set by writers that must not post the same operation twice (e.g. "recurring:<id>:<run>").
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(length=128), nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(primary_key=True, server_default=text("TIMEZONE('utc', now())"))
     updated_at: Mapped[updated_at]
 
     user_operations: Mapped["User"] = relationship(
@@ -102,3 +135,157 @@ class Operation(Base):
     wallet_operations: Mapped["Wallet"] = relationship(
         back_populates="operations"
     )
+
+    __table_args__ = (
+        Index("ix_operation_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_operation_user_id_category_created_at", "user_id", "category", "created_at", "id"),
+        Index("ix_operation_user_id_type_operation_created_at", "user_id", "type_operation", "created_at", "id"),
+        Index("ix_operation_wallet_id_created_at", "wallet_id", "created_at", "id"),
+        Index("ux_operation_idempotency_key", "idempotency_key", "created_at", unique=True, postgresql_where=text("idempotency_key IS NOT NULL")),
+        # btree_gin: one index answers "this user's operations matching these words".
+        Index("ix_operation_search", "user_id", text(OPERATION_SEARCH_VECTOR), postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+class OperationAggregate(Base):
+    __tablename__ = "operation_aggregate"
+
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), primary_key=True)
+    category: Mapped[Category] = mapped_column(category_enum, primary_key=True)
+    type_operation: Mapped[TypeOperation] = mapped_column(type_operation_enum, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    total: Mapped[decimal.Decimal] = mapped_column(Numeric(precision=18, scale=2), default=0, nullable=False)
+    operations_count: Mapped[int] = mapped_column(default=0, nullable=False)
+    updated_at: Mapped[updated_at]
+
+
+class OperationArchiveTotal(Base):
+    """Totals of operations in detached (archived) partitions, per wallet/category/type."""
+    __tablename__ = "operation_archive_total"
+
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), primary_key=True)
+    category: Mapped[Category] = mapped_column(category_enum, primary_key=True)
+    type_operation: Mapped[TypeOperation] = mapped_column(type_operation_enum, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    total: Mapped[decimal.Decimal] = mapped_column(Numeric(precision=18, scale=2), default=0, nullable=False)
+    operations_count: Mapped[int] = mapped_column(default=0, nullable=False)
+    updated_at: Mapped[updated_at]
+
+
+class Transfer(Base):
+    """Money moved between two wallets of one user: the debit and credit leg in one row."""
+    __tablename__ = "transfer"
+
+    id: Mapped[intpk]
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    from_wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), nullable=False)
+    to_wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), nullable=False)
+    amount: Mapped[money] = mapped_column(nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(String(length=500), nullable=True)
+    created_at: Mapped[created_at]
+
+    __table_args__ = (
+        CheckConstraint("from_wallet_id <> to_wallet_id", name="ck_transfer_distinct_wallets"),
+        CheckConstraint("amount > 0", name="ck_transfer_amount_positive"),
+        Index("ix_transfer_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_transfer_from_wallet_id", "from_wallet_id"),
+        Index("ix_transfer_to_wallet_id", "to_wallet_id"),
+    )
+
+
+class RecurringOperation(Base):
+    __tablename__ = "recurring_operation"
+
+    id: Mapped[intpk]
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), index=True, nullable=False)
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), nullable=False)
+    category: Mapped[Category] = mapped_column(category_enum, nullable=False)
+    type_operation: Mapped[TypeOperation] = mapped_column(type_operation_enum, nullable=False)
+    amount: Mapped[money] = mapped_column(nullable=False)
+    interval: Mapped[Interval] = mapped_column(interval_enum, nullable=False)
+    starts_at: Mapped[datetime.datetime] = mapped_column(nullable=False)
+    next_run_at: Mapped[datetime.datetime] = mapped_column(nullable=False)
+    last_run_at: Mapped[Optional[datetime.datetime]] = mapped_column(nullable=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    created_at: Mapped[created_at]
+    updated_at: Mapped[updated_at]
+
+    __table_args__ = (
+        # The scheduler only ever asks for active schedules that are due.
+        Index("ix_recurring_operation_next_run_at", "next_run_at", postgresql_where=text("is_active")),
+    )
+
+
+class BudgetLimit(Base):
+    """Monthly spending limit of one wallet and category."""
+    __tablename__ = "budget_limit"
+
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), primary_key=True)
+    category: Mapped[Category] = mapped_column(category_enum, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), index=True, nullable=False)
+    amount: Mapped[money] = mapped_column(nullable=False)
+    created_at: Mapped[created_at]
+    updated_at: Mapped[updated_at]
+
+    __table_args__ = (
+        CheckConstraint("amount > 0", name="ck_budget_limit_amount_positive"),
+    )
+
+
+class BudgetSpending(Base):
+    """Running sum of loss operations per wallet, category and month (first day, UTC)."""
+    __tablename__ = "budget_spending"
+
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), primary_key=True)
+    category: Mapped[Category] = mapped_column(category_enum, primary_key=True)
+    period: Mapped[datetime.datetime] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    spent: Mapped[decimal.Decimal] = mapped_column(Numeric(precision=18, scale=2), default=0, nullable=False)
+    updated_at: Mapped[updated_at]
+
+
+class BudgetAlert(Base):
+    __tablename__ = "budget_alert"
+
+    id: Mapped[intpk]
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), nullable=False)
+    category: Mapped[Category] = mapped_column(category_enum, nullable=False)
+    period: Mapped[datetime.datetime] = mapped_column(nullable=False)
+    threshold: Mapped[int] = mapped_column(nullable=False)
+    limit_amount: Mapped[money] = mapped_column(nullable=False)
+    spent: Mapped[decimal.Decimal] = mapped_column(Numeric(precision=18, scale=2), nullable=False)
+    created_at: Mapped[created_at]
+
+    __table_args__ = (
+        # One alert per threshold and month, however often spending goes back and forth across it.
+        UniqueConstraint("wallet_id", "category", "period", "threshold", name="ux_budget_alert_threshold"),
+        Index("ix_budget_alert_user_id_created_at", "user_id", "created_at", "id"),
+    )
+
+
+class ExchangeRate(Base):
+    """Units of BASE_CURRENCY per unit of ``currency``, loaded from a file by src/currency/rates.py."""
+    __tablename__ = "exchange_rate"
+
+    currency: Mapped[str] = mapped_column(String(length=3), primary_key=True)
+    rate: Mapped[decimal.Decimal] = mapped_column(Numeric(precision=20, scale=10), nullable=False)
+    # The load that last wrote the row; the highest version tells processes their cached rates are stale.
+    version: Mapped[int] = mapped_column(nullable=False)
+    updated_at: Mapped[updated_at]
+
+    __table_args__ = (
+        CheckConstraint("rate > 0", name="ck_exchange_rate_rate_positive"),
+    )
+
+
+class OutboxEvent(Base):
+    """Side effect of a write, recorded in the write's transaction and consumed by src/outbox.py."""
+    __tablename__ = "outbox_event"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    user_id: Mapped[Optional[int]] = mapped_column(nullable=True)
+    kind: Mapped[str] = mapped_column(String(length=64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    created_at: Mapped[created_at]
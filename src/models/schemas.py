@@ -0,0 +1,9 @@
+from decimal import Decimal
+from typing import Annotated
+
+from pydantic import Field
+
+
+Money = Annotated[Decimal, Field(max_digits=14, decimal_places=2)]
+
+Currency = Annotated[str, Field(pattern=r"^[A-Z]{3}$")]
@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import decimal
+
+from collections import defaultdict
+from typing import Iterable, Mapping, Optional
+
+from sqlalchemy import case, delete, func, insert, select, text, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.budgets.spending import apply_spending
+from src.database import async_session_maker
+from src.models.models import Operation, OperationAggregate, OperationArchiveTotal, TypeOperation, Wallet
+
+
+async def apply_deltas(session: AsyncSession, deltas: Iterable[dict]) -> None:
+    """
+    Add deltas to the per-wallet/category/type aggregates in the caller's transaction.
+
+    Each delta is a dict with user_id, wallet_id, category, type_operation,
+    total and operations_count; (wallet_id, category, type_operation) must be
+    unique within one call. Pass negative values to undo an operation.
+    """
+    deltas = list(deltas)
+    if not deltas:
+        return
+    stmt = pg_insert(OperationAggregate).values(deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OperationAggregate.wallet_id, OperationAggregate.category, OperationAggregate.type_operation],
+        set_={
+            "total": OperationAggregate.total + stmt.excluded.total,
+            "operations_count": OperationAggregate.operations_count + stmt.excluded.operations_count,
+            "updated_at": text("TIMEZONE('utc', now())"),
+        },
+    )
+    await session.execute(stmt)
+
+
+async def apply_operations(session: AsyncSession, operations: Iterable[Mapping]) -> None:
+    """
+    Apply the budget and aggregate effects of already inserted operations.
+
+    Operations are mappings with user_id, wallet_id, category, type_operation,
+    amount and created_at. However many there are, this is one UPDATE (a net
+    budget delta per wallet), one aggregate upsert and one spending upsert.
+    """
+    operations = list(operations)
+    budgets = defaultdict(decimal.Decimal)
+    aggregates = {}
+    for operation in operations:
+        amount = operation["amount"]
+        budgets[operation["wallet_id"]] += amount if operation["type_operation"] == TypeOperation.profit else -amount
+
+        key = (operation["wallet_id"], operation["category"], operation["type_operation"])
+        if key not in aggregates:
+            aggregates[key] = {
+                "user_id": operation["user_id"],
+                "wallet_id": key[0],
+                "category": key[1],
+                "type_operation": key[2],
+                "total": decimal.Decimal(0),
+                "operations_count": 0,
+            }
+        aggregates[key]["total"] += amount
+        aggregates[key]["operations_count"] += 1
+
+    if not budgets:
+        return
+    stmt = update(Wallet).where(Wallet.id.in_(budgets)).values(budget=Wallet.budget + case(budgets, value=Wallet.id), version=Wallet.version + 1)
+    await session.execute(stmt, execution_options={"synchronize_session": False})
+    await apply_deltas(session, aggregates.values())
+    await apply_spending(session, operations)
+
+
+async def rebuild_aggregates(session: AsyncSession, wallet_id: Optional[int] = None) -> None:
+    """
+    Recompute the aggregates, for one wallet or for all of them.
+
+    Totals are the live Operation rows plus what archive_partitions folded into
+    operation_archive_total before detaching old partitions.
+
+    Writers' apply_deltas upserts wait for the caller's commit, so none is
+    lost: a write that committed earlier is in the recount, a later one is
+    added on top of it.
+    """
+    await session.execute(text("LOCK TABLE operation_aggregate IN SHARE ROW EXCLUSIVE MODE"))
+    stmt_del = delete(OperationAggregate)
+    live = select(
+        Operation.wallet_id,
+        Operation.category,
+        Operation.type_operation,
+        Operation.user_id,
+        func.sum(Operation.amount).label("total"),
+        func.count().label("operations_count"),
+    ).group_by(Operation.wallet_id, Operation.category, Operation.type_operation, Operation.user_id)
+    archived = select(
+        OperationArchiveTotal.wallet_id,
+        OperationArchiveTotal.category,
+        OperationArchiveTotal.type_operation,
+        OperationArchiveTotal.user_id,
+        OperationArchiveTotal.total,
+        OperationArchiveTotal.operations_count,
+    )
+    if wallet_id is not None:
+        stmt_del = stmt_del.where(OperationAggregate.wallet_id == wallet_id)
+        live = live.where(Operation.wallet_id == wallet_id)
+        archived = archived.where(OperationArchiveTotal.wallet_id == wallet_id)
+
+    totals = union_all(live, archived).subquery()
+    query = select(
+        totals.c.wallet_id,
+        totals.c.category,
+        totals.c.type_operation,
+        totals.c.user_id,
+        func.sum(totals.c.total),
+        func.sum(totals.c.operations_count),
+    ).group_by(totals.c.wallet_id, totals.c.category, totals.c.type_operation, totals.c.user_id)
+
+    stmt = insert(OperationAggregate).from_select(
+        ["wallet_id", "category", "type_operation", "user_id", "total", "operations_count"],
+        query,
+    )
+    await session.execute(stmt_del)
+    await session.execute(stmt)
+
+
+async def main(wallet_id: Optional[int] = None) -> None:
+    async with async_session_maker() as session:
+        await rebuild_aggregates(session, wallet_id)
+        await session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild operation aggregates from the operation table.")
+    parser.add_argument("--wallet-id", type=int, default=None, help="only rebuild this wallet")
+    args = parser.parse_args()
+    asyncio.run(main(args.wallet_id))
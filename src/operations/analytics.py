@@ -0,0 +1,62 @@
+import datetime
+import enum
+
+from typing import List
+
+from fastapi import HTTPException
+from sqlalchemy import Select, func, literal_column, select
+
+from src.models.models import Operation, TypeOperation
+
+
+MAX_RANGE = datetime.timedelta(days=3 * 366)
+
+
+class Period(enum.Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+def to_utc(moment: datetime.datetime) -> datetime.datetime:
+    """Operation timestamps are naive UTC; convert aware query parameters to match."""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def month_scope(moment: datetime.datetime) -> str:
+    return f"analytics:{moment:%Y-%m}"
+
+
+def month_scopes(date_from: datetime.datetime, date_to: datetime.datetime) -> List[str]:
+    """Cache scopes of every month overlapping [date_from, date_to)."""
+    scopes = []
+    year, month = date_from.year, date_from.month
+    while datetime.datetime(year, month, 1) < date_to:
+        scopes.append(f"analytics:{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return scopes
+
+
+def analytics_query(user_id: int, period: Period, date_from: datetime.datetime, date_to: datetime.datetime, *filters) -> Select:
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="date_to must be after date_from.")
+    if date_to - date_from > MAX_RANGE:
+        raise HTTPException(status_code=400, detail="Date range is limited to three years.")
+
+    # Inlined rather than bound so SELECT and GROUP BY render the same expression; Period is a closed enum.
+    bucket = func.date_trunc(literal_column(f"'{period.value}'"), Operation.created_at).label("period_start")
+    return (
+        select(
+            bucket,
+            Operation.category,
+            Operation.currency,
+            func.coalesce(func.sum(Operation.amount).filter(Operation.type_operation == TypeOperation.profit), 0).label("profit"),
+            func.coalesce(func.sum(Operation.amount).filter(Operation.type_operation == TypeOperation.loss), 0).label("loss"),
+            func.count().label("operations_count"),
+        )
+        .where(Operation.user_id == user_id, Operation.created_at >= date_from, Operation.created_at < date_to, *filters)
+        .group_by(bucket, Operation.category, Operation.currency)
+        .order_by(bucket, Operation.category, Operation.currency)
+    )
@@ -0,0 +1,239 @@
+import codecs
+import csv
+import datetime
+import io
+import json
+
+from collections import deque
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import Select, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import outbox
+from src.database import async_session_maker
+from src.models.models import Operation, Wallet
+from src.operations.aggregates import apply_operations
+from src.operations.analytics import month_scope, to_utc
+from src.operations.schemas import ExportFormat, ImportReport, ImportRejectedRow, OperationImport
+
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ROWS = 1000
+EXPORT_CHUNK = 2000
+
+EXPORT_COLUMNS = (
+    Operation.id,
+    Operation.wallet_id,
+    Operation.category,
+    Operation.type_operation,
+    Operation.amount,
+    Operation.currency,
+    Operation.description,
+    Operation.merchant,
+    Operation.created_at,
+)
+
+Record = Tuple[int, Optional[object], Optional[str]]
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+class _Queue:
+    """Iterator over a deque that can run empty and be refilled, for a csv.reader fed as the body arrives."""
+
+    def __init__(self, lines: deque):
+        self.lines = lines
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_records(request: Request) -> AsyncIterator[Record]:
+    """
+    Yield (row number, record, parse error) from a JSON array, NDJSON or CSV body.
+
+    NDJSON and CSV bodies are parsed as they arrive; a CSV body starts with a
+    header naming the OperationImport fields, and quoted CSV fields may span
+    lines.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type == "text/csv":
+        # One reader over the whole body. It is only asked for a row once the
+        # queued lines close every quote, so it never runs dry inside a record.
+        queued = deque()
+        reader = csv.reader(_Queue(queued))
+        quotes = 0
+        header = None
+        number = 0
+        async for line in _lines(request):
+            if not queued and not line.strip():
+                continue
+            queued.append(line + "\n")
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            quotes = 0
+            values = next(reader)
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            number += 1
+            yield number, {key: value for key, value in zip(header, values) if value != ""}, None
+        if queued:
+            yield number + 1, None, "Unterminated quoted field."
+
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        number = 0
+        async for line in _lines(request):
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line), None
+            except ValueError as e:
+                yield number, None, f"Invalid JSON: {e}"
+
+    elif content_type == "application/json":
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body.")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of operations.")
+        for number, record in enumerate(body, start=1):
+            yield number, record, None
+
+    else:
+        raise HTTPException(status_code=415, detail="Use application/json, application/x-ndjson or text/csv.")
+
+
+async def _flush(session: AsyncSession, user_id: int, batch: List[OperationImport], currencies: Dict[int, str]) -> None:
+    now = datetime.datetime.utcnow()
+    scopes = {"wallets", "operations", "budgets"}
+    rows = []
+    for operation in batch:
+        rows.append({
+            "user_id": user_id,
+            "wallet_id": operation.wallet_id,
+            "category": operation.category,
+            "type_operation": operation.type_operation,
+            "amount": operation.amount,
+            "currency": currencies[operation.wallet_id],
+            "description": operation.description,
+            "merchant": operation.merchant,
+            "created_at": to_utc(operation.created_at) if operation.created_at else now,
+        })
+        scopes.update((f"wallet:{operation.wallet_id}", month_scope(rows[-1]["created_at"])))
+
+    await session.execute(insert(Operation), rows)
+    await apply_operations(session, rows)
+    await outbox.emit_invalidation(session, user_id, scopes)
+    await session.commit()
+
+
+async def import_operations(session: AsyncSession, user_id: int, records: AsyncIterator[Record]) -> ImportReport:
+    """
+    Validate and insert operations in batches of BATCH_SIZE, one transaction per batch.
+
+    Each batch records the cache invalidation of the wallets and months it touches in the outbox.
+    """
+    # wallet id -> currency of every wallet the user owns.
+    query = select(Wallet.id, Wallet.currency).where(Wallet.user_id == user_id)
+    owned = dict((await session.execute(query)).all())
+
+    report = ImportReport(accepted=0, rejected=0, rejected_rows=[])
+    batch = []
+
+    def reject(number: int, errors: Iterable) -> None:
+        report.rejected += 1
+        if len(report.rejected_rows) < MAX_REPORTED_ROWS:
+            report.rejected_rows.append(ImportRejectedRow(row=number, errors=list(errors)))
+
+    async for number, record, error in records:
+        if error is not None:
+            reject(number, [error])
+            continue
+        try:
+            operation = OperationImport.model_validate(record)
+        except ValidationError as e:
+            reject(number, [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"] for err in e.errors()])
+            continue
+        if operation.wallet_id not in owned:
+            reject(number, ["wallet_id: Wallet not found."])
+            continue
+
+        batch.append(operation)
+        if len(batch) >= BATCH_SIZE:
+            await _flush(session, user_id, batch, owned)
+            report.accepted += len(batch)
+            batch = []
+
+    if batch:
+        await _flush(session, user_id, batch, owned)
+        report.accepted += len(batch)
+
+    return report
+
+
+def export_query(*filters) -> Select:
+    return select(*EXPORT_COLUMNS).where(*filters).order_by(Operation.created_at, Operation.id).execution_options(yield_per=EXPORT_CHUNK)
+
+
+def _format_rows(rows, export_format: ExportFormat) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for id, wallet_id, category, type_operation, amount, currency, description, merchant, created_at in rows:
+        if export_format == ExportFormat.csv:
+            writer.writerow((id, wallet_id, category.value, type_operation.value, amount, currency, description, merchant, created_at.isoformat()))
+            continue
+        buffer.write(json.dumps({
+            "id": id,
+            "wallet_id": wallet_id,
+            "category": category.value,
+            "type_operation": type_operation.value,
+            # A string, like the JSON responses: no binary floating point for money.
+            "amount": str(amount),
+            "currency": currency,
+            "description": description,
+            "merchant": merchant,
+            "created_at": created_at.isoformat(),
+        }))
+        buffer.write("\n")
+    return buffer.getvalue().encode()
+
+
+async def export_operations(query: Select, export_format: ExportFormat) -> AsyncIterator[bytes]:
+    """
+    Stream the rows of ``query`` as CSV or NDJSON, EXPORT_CHUNK rows at a time.
+
+    The rows are read through a server-side cursor on a session owned by the
+    generator: the request's session is closed before a StreamingResponse body
+    is sent.
+    """
+    if export_format == ExportFormat.csv:
+        yield (",".join(column.key for column in EXPORT_COLUMNS) + "\r\n").encode()
+
+    async with async_session_maker() as session:
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            yield _format_rows(rows, export_format)
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import re
+
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import async_session_maker
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = "operation_default"
+
+# Serializes partition maintenance between workers; arbitrary but fixed.
+_LOCK_ID = 7240118
+
+_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def month_start(moment: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime.datetime, months: int) -> datetime.datetime:
+    year, index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return datetime.datetime(year, index + 1, 1)
+
+
+def partition_name(month: datetime.datetime) -> str:
+    return f"operation_y{month:%Y}m{month:%m}"
+
+
+async def _partitions(session: AsyncSession) -> List[Tuple[str, Optional[datetime.datetime]]]:
+    """(name, exclusive upper bound) of every attached partition; the default partition has no bound."""
+    query = text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'operation'::regclass"
+    )
+    partitions = []
+    for name, bound in (await session.execute(query)).all():
+        match = _BOUND.search(bound)
+        partitions.append((name, datetime.datetime.fromisoformat(match.group(1)) if match else None))
+    return partitions
+
+
+async def ensure_partitions(session: AsyncSession, ahead: int = settings.OPERATION_PARTITIONS_AHEAD) -> List[str]:
+    """
+    Create the monthly partitions up to ``ahead`` months past the current one.
+
+    Only months after the last range already covered are created. Rows that
+    already landed in the default partition for a new month (future dated
+    imports) are moved into it before it is attached. Returns the names of the
+    partitions created; commits.
+    """
+    await session.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _LOCK_ID})
+    covered = max((high for _, high in await _partitions(session) if high is not None), default=datetime.datetime.min)
+    current = month_start(datetime.datetime.utcnow())
+
+    created = []
+    for offset in range(ahead + 1):
+        low, high = add_months(current, offset), add_months(current, offset + 1)
+        if low < covered:
+            continue
+        name = partition_name(low)
+        bounds = {"low": low, "high": high}
+        await session.execute(text(f"CREATE TABLE {name} (LIKE operation INCLUDING DEFAULTS)"))
+        # The CHECK lets ATTACH skip scanning the new partition.
+        await session.execute(text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_range CHECK (created_at >= '{low}' AND created_at < '{high}')"))
+        # Held until commit: a row written to the default partition after the
+        # move would be left behind and fail the ATTACH.
+        await session.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE"))
+        await session.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :low AND created_at < :high RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), bounds)
+        await session.execute(text(f"ALTER TABLE operation ATTACH PARTITION {name} FOR VALUES FROM ('{low}') TO ('{high}')"))
+        await session.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_range"))
+        created.append(name)
+
+    await session.commit()
+    return created
+
+
+async def archive_partitions(session: AsyncSession, keep_months: int) -> List[str]:
+    """
+    Detach the partitions that end before the last ``keep_months`` months.
+
+    Each partition's totals are folded into operation_archive_total before it
+    is detached, in the same transaction, so rebuild_aggregates keeps counting
+    them. operation_aggregate, and with it get_profit_and_loss, is unaffected.
+    The detached tables are left in place to be dumped or dropped. Rows
+    written later for an archived month (a backdated import or recurring
+    catch-up) go to the default partition and stay live there; they are
+    counted by the aggregates like any other live row and never archived.
+    Returns the names; commits after each partition.
+    """
+    await session.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _LOCK_ID})
+    cutoff = add_months(month_start(datetime.datetime.utcnow()), -keep_months)
+
+    archived = []
+    for name, high in sorted(await _partitions(session), key=lambda partition: partition[1] or datetime.datetime.max):
+        if high is None or high > cutoff:
+            continue
+        # Every commit below releases the lock.
+        await session.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _LOCK_ID})
+        # Writes to this partition wait from here; reads of the rest of operation do not.
+        await session.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+        await session.execute(text(
+            "INSERT INTO operation_archive_total (wallet_id, category, type_operation, user_id, total, operations_count) "
+            f"SELECT wallet_id, category, type_operation, user_id, SUM(amount), COUNT(*) FROM {name} "
+            "GROUP BY wallet_id, category, type_operation, user_id "
+            "ON CONFLICT (wallet_id, category, type_operation) DO UPDATE SET "
+            "total = operation_archive_total.total + EXCLUDED.total, "
+            "operations_count = operation_archive_total.operations_count + EXCLUDED.operations_count, "
+            "updated_at = TIMEZONE('utc', now())"
+        ))
+        # DETACH ... CONCURRENTLY cannot run inside a transaction; the exclusive
+        # lock on operation is only held from here to the commit.
+        await session.execute(text(f"ALTER TABLE operation DETACH PARTITION {name}"))
+        await session.commit()
+        archived.append(name)
+        logger.info("archived operation partition %s", name)
+
+    await session.commit()
+    return archived
+
+
+async def maintain_partitions(interval_seconds: float = settings.OPERATION_PARTITION_MAINTENANCE_SECONDS) -> None:
+    """Create upcoming partitions, and archive old ones when OPERATION_KEEP_MONTHS is set, forever."""
+    while True:
+        try:
+            async with async_session_maker() as session:
+                created = await ensure_partitions(session)
+                if created:
+                    logger.info("created operation partitions %s", ", ".join(created))
+                if settings.OPERATION_KEEP_MONTHS is not None:
+                    await archive_partitions(session, settings.OPERATION_KEEP_MONTHS)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("operation partition maintenance failed")
+        await asyncio.sleep(interval_seconds)
+
+
+async def main(command: str, ahead: int, keep_months: Optional[int]) -> None:
+    async with async_session_maker() as session:
+        if command == "ensure":
+            print("\n".join(await ensure_partitions(session, ahead)))
+        else:
+            print("\n".join(await archive_partitions(session, keep_months)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming operation partitions or archive old ones.")
+    parser.add_argument("command", choices=["ensure", "archive"])
+    parser.add_argument("--ahead", type=int, default=settings.OPERATION_PARTITIONS_AHEAD, help="months to create beyond the current one")
+    parser.add_argument("--keep-months", type=int, default=settings.OPERATION_KEEP_MONTHS, help="archive partitions that end before this many months ago")
+    args = parser.parse_args()
+    if args.command == "archive" and args.keep_months is None:
+        parser.error("archive needs --keep-months (or OPERATION_KEEP_MONTHS)")
+    asyncio.run(main(args.command, args.ahead, args.keep_months))
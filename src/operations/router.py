@@ -1,16 +1,27 @@
+from datetime import datetime
+from decimal import Decimal
 from typing import Optional
-from fastapi import APIRouter, Depends
-from fastapi_cache import FastAPICache
-from fastapi_cache.decorator import cache
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
-from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy import delete, distinct, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src import outbox
+from src.cache import cached
+from src.config import settings
+from src.currency.rates import check_missing, convert, get_rates
 from src.database import get_async_session
-from src.wallet.schemas import WalletRead
 from src.auth.auth import current_user
-from src.models.models import Operation, User, Wallet, Category
-from src.operations.schemas import OperationCreate, OperationRead
+from src.budgets.spending import apply_spending
+from src.models.models import Operation, OperationAggregate, User, Wallet, Category, TypeOperation
+from src.operations import bulk, search
+from src.operations.aggregates import apply_deltas
+from src.operations.analytics import Period, analytics_query, month_scope, month_scopes, to_utc
+from src.operations.schemas import AnalyticsRow, ExportFormat, OperationCreate, OperationPage, OperationRead
+from src.pagination import keyset, page
+from src.responses import RawJSONResponse, typed_response
 
 
 router = APIRouter(
@@ -22,104 +33,211 @@ router = APIRouter(
 @router.post("/add_operation")
 async def add_operation(data_operation: OperationCreate, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
     data = data_operation.dict()
-    query = select(Wallet).where(Wallet.user_id == user.id)
-    result = await session.execute(query)
-    list_wallets = [WalletRead.model_validate(row, from_attributes=True) for row in result.scalars().all()]
-    try:
-        if any(map(lambda x: True if x.id == data["wallet_id"] else False, list_wallets)):
-            data["user_id"] = user.id
-            data["category"] = data_operation.category.value
-            data["type_operation"] = data_operation.type_operation.value
-            stmt = insert(Operation).values(data)
-            if data_operation.type_operation.value == "profit":
-                stmt2 = update(Wallet).where(Wallet.id == data["wallet_id"]).values(budget=Wallet.budget + data["amount"])
-                
-            else:
-                stmt2 = update(Wallet).where(Wallet.id == data["wallet_id"]).values(budget=Wallet.budget - data["amount"])
-            
-            await session.execute(stmt)
-            await session.execute(stmt2)
-            await session.commit()
-
-            await FastAPICache().clear()
-            return {"status": "success", "detail": OperationCreate.model_validate(data, from_attributes=True)}
-        
-        else:
-            return {"status": "fall", "detail": "Not your wallet."}
-    except Exception as e:
-        print(e)
-        return {"status": "fall"}
+    data["user_id"] = user.id
+    delta = data["amount"] if data_operation.type_operation == TypeOperation.profit else -data["amount"]
+
+    # The budget update doubles as the ownership check: it matches no row for someone else's wallet.
+    stmt = update(Wallet).where(Wallet.id == data["wallet_id"], Wallet.user_id == user.id).values(budget=Wallet.budget + delta, version=Wallet.version + 1).returning(Wallet.currency)
+    result = await session.execute(stmt)
+    data["currency"] = result.scalar_one_or_none()
+    if data["currency"] is None:
+        raise HTTPException(status_code=404, detail="Wallet not found.")
+
+    result = await session.execute(insert(Operation).values(data).returning(Operation.id, Operation.created_at))
+    operation_id, created_at = result.one()
+    await apply_deltas(session, [{
+        "user_id": user.id,
+        "wallet_id": data["wallet_id"],
+        "category": data["category"],
+        "type_operation": data["type_operation"],
+        "total": data["amount"],
+        "operations_count": 1,
+    }])
+    await apply_spending(session, [{**data, "created_at": created_at}])
+    await outbox.emit_invalidation(session, user.id, ["wallets", "operations", "budgets", f"wallet:{data['wallet_id']}", month_scope(created_at)])
+    await session.commit()
+    await outbox.committed(session)
+
+    return {"status": "success", "id": operation_id, "detail": data_operation, "currency": data["currency"]}
 
 
 @router.post("/delete_operation")
-async def add_operation(operation_id: int, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    query = select(Operation).where(Operation.user_id == user.id)
-    res = await session.execute(query)
-    result = [OperationRead.model_validate(row, from_attributes=True) for row in res.scalars().all()]
-    operation = list(map(lambda x: x, filter(lambda x: x.id == operation_id, result)))
-    print(operation[0].wallet_id)
-    try:
-        if operation:
-            stmt_del = delete(Operation).where(Operation.id == operation_id)
-            await session.execute(stmt_del)
-            if operation[0].type_operation.value == "profit":
-                stmt = update(Wallet).where(Wallet.id == operation[0].wallet_id).values(budget=Wallet.budget - operation[0].amount)
-                
-            else:
-                stmt = update(Wallet).where(Wallet.id == operation[0].wallet_id).values(budget=Wallet.budget + operation[0].amount)
-
-            await session.execute(stmt)
-            await session.commit()
-
-            await FastAPICache().clear()
-            return {"status": "succes", "detail": result}
-
-        else: 
-            raise Exception
-    except Exception as e:
-        return {"status": "fall", "detail": "Not your wallet."}
-
-@router.get("/get_all_operations")
-@cache(expire=120)
-async def get_all_operations(limit: int=5, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    query = select(Operation).where(Operation.user_id == user.id).limit(limit=limit).order_by(Operation.created_at.desc())
-    res = await session.execute(query)
-
-    result = [OperationRead.model_validate(row, from_attributes=True) for row in res.scalars().all()] 
-    return result
-
-@router.get("/get_category_operations")
-@cache(expire=120)
-async def get_category_operations(category: Optional[Category], limit: int=5, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    query = select(Operation).where(Operation.user_id == user.id, Operation.category == category.value).limit(limit=limit).order_by(Operation.created_at.desc())
-    res = await session.execute(query)
-
-    result = [OperationRead.model_validate(row, from_attributes=True) for row in res.scalars().all()]
-    return result
+async def delete_operation(operation_id: int, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    stmt = delete(Operation).where(Operation.id == operation_id, Operation.user_id == user.id).returning(
+        Operation.id, Operation.wallet_id, Operation.category, Operation.type_operation, Operation.amount,
+        Operation.currency, Operation.description, Operation.merchant, Operation.created_at
+    )
+    result = await session.execute(stmt)
+    operation = result.one_or_none()
+    if operation is None:
+        raise HTTPException(status_code=404, detail="Operation not found.")
+
+    delta = -operation.amount if operation.type_operation == TypeOperation.profit else operation.amount
+    stmt = update(Wallet).where(Wallet.id == operation.wallet_id).values(budget=Wallet.budget + delta, version=Wallet.version + 1)
+    await session.execute(stmt)
+    await apply_deltas(session, [{
+        "user_id": user.id,
+        "wallet_id": operation.wallet_id,
+        "category": operation.category,
+        "type_operation": operation.type_operation,
+        "total": -operation.amount,
+        "operations_count": -1,
+    }])
+    await apply_spending(session, [{**operation._mapping, "user_id": user.id}], sign=-1)
+    await outbox.emit_invalidation(session, user.id, ["wallets", "operations", "budgets", f"wallet:{operation.wallet_id}", month_scope(operation.created_at)])
+    await session.commit()
+    await outbox.committed(session)
+
+    return {"status": "success", "detail": OperationRead.model_validate(operation, from_attributes=True)}
+
+@router.post("/import_operations")
+async def import_operations(request: Request, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    report = await bulk.import_operations(session, user.id, bulk.iter_records(request))
+    await outbox.committed(session)
+    return report
+
+@router.get("/export_operations")
+async def export_operations(
+    format: ExportFormat = ExportFormat.csv,
+    wallet_id: Optional[int] = None,
+    category: Optional[Category] = None,
+    type_operation: Optional[TypeOperation] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user: User = Depends(current_user),
+):
+    filters = [Operation.user_id == user.id]
+    if wallet_id is not None:
+        filters.append(Operation.wallet_id == wallet_id)
+    if category is not None:
+        filters.append(Operation.category == category)
+    if type_operation is not None:
+        filters.append(Operation.type_operation == type_operation)
+    # Normalized here: a bad parameter inside the stream would only surface after the 200 headers are sent.
+    if date_from is not None:
+        filters.append(Operation.created_at >= to_utc(date_from))
+    if date_to is not None:
+        filters.append(Operation.created_at < to_utc(date_to))
+
+    media_type = "text/csv" if format == ExportFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        bulk.export_operations(bulk.export_query(*filters), format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="operations.{format.value}"'},
+    )
+
+_read_columns = (
+    Operation.id, Operation.wallet_id, Operation.category, Operation.type_operation, Operation.amount,
+    Operation.currency, Operation.description, Operation.merchant, Operation.created_at,
+)
+_page_adapter = TypeAdapter(OperationPage)
 
-@router.get("/get_all_profit_operations")
-@cache(expire=120)
-async def get_all_profit_operations(limit: int=5, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    query = select(Operation).where(Operation.user_id == user.id, Operation.type_operation == "profit").limit(limit=limit).order_by(Operation.created_at.desc())
+async def _list_operations(session: AsyncSession, user: User, cursor: Optional[str], limit: int, *filters) -> RawJSONResponse:
+    query = keyset(select(*_read_columns).where(Operation.user_id == user.id, *filters), Operation.created_at, Operation.id, cursor, limit)
     res = await session.execute(query)
-
-    result = [OperationRead.model_validate(row, from_attributes=True) for row in res.scalars().all()] 
-    return result
-
-@router.get("/get_all_loss_operations")
-@cache(expire=120)
-async def get_all_loss_operations(limit: int=5, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    query = select(Operation).where(Operation.user_id == user.id, Operation.type_operation == "loss").limit(limit=limit).order_by(Operation.created_at.desc())
+    rows, next_cursor = page(res.all(), limit)
+
+    return typed_response(_page_adapter, {"items": rows, "next_cursor": next_cursor})
+
+@router.get("/get_all_operations", response_model=OperationPage)
+@cached(expire=120, scopes=["operations"])
+async def get_all_operations(limit: int = Query(default=5, ge=1, le=500), cursor: Optional[str] = None, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    return await _list_operations(session, user, cursor, limit)
+
+@router.get("/get_category_operations", response_model=OperationPage)
+@cached(expire=120, scopes=["operations"])
+async def get_category_operations(category: Category, limit: int = Query(default=5, ge=1, le=500), cursor: Optional[str] = None, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    return await _list_operations(session, user, cursor, limit, Operation.category == category)
+
+@router.get("/get_all_profit_operations", response_model=OperationPage)
+@cached(expire=120, scopes=["operations"])
+async def get_all_profit_operations(limit: int = Query(default=5, ge=1, le=500), cursor: Optional[str] = None, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    return await _list_operations(session, user, cursor, limit, Operation.type_operation == TypeOperation.profit)
+
+@router.get("/get_all_loss_operations", response_model=OperationPage)
+@cached(expire=120, scopes=["operations"])
+async def get_all_loss_operations(limit: int = Query(default=5, ge=1, le=500), cursor: Optional[str] = None, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    return await _list_operations(session, user, cursor, limit, Operation.type_operation == TypeOperation.loss)
+
+@router.get("/search_operations", response_model=OperationPage)
+@cached(expire=120, scopes=["operations"])
+async def search_operations(
+    q: str = Query(min_length=1, max_length=200),
+    wallet_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    amount_min: Optional[Decimal] = None,
+    amount_max: Optional[Decimal] = None,
+    limit: int = Query(default=20, ge=1, le=500),
+    cursor: Optional[str] = None,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    filters = [search.matches(q)]
+    if wallet_id is not None:
+        filters.append(Operation.wallet_id == wallet_id)
+    if date_from is not None:
+        filters.append(Operation.created_at >= to_utc(date_from))
+    if date_to is not None:
+        filters.append(Operation.created_at < to_utc(date_to))
+    if amount_min is not None:
+        filters.append(Operation.amount >= amount_min)
+    if amount_max is not None:
+        filters.append(Operation.amount <= amount_max)
+    return await _list_operations(session, user, cursor, limit, *filters)
+
+def _analytics_scopes(date_from: datetime, date_to: datetime, **kwargs):
+    # "analytics" is only evicted by wallet deletion, whose operations span unknown months.
+    return ["analytics", *month_scopes(to_utc(date_from), to_utc(date_to))]
+
+@router.get("/get_analytics")
+@cached(expire=600, scopes=_analytics_scopes)
+async def get_analytics(
+    date_from: datetime,
+    date_to: datetime,
+    period: Period = Period.month,
+    wallet_id: Optional[int] = None,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    filters = [Operation.wallet_id == wallet_id] if wallet_id is not None else []
+    query = analytics_query(user.id, period, to_utc(date_from), to_utc(date_to), *filters)
     res = await session.execute(query)
 
-    result = [OperationRead.model_validate(row, from_attributes=True) for row in res.scalars().all()] 
-    return result
+    return [AnalyticsRow.model_validate(row, from_attributes=True) for row in res.all()]
 
 @router.get("/get_profit_and_loss")
-@cache(expire=120)
-async def get_profit_and_loss(wallet_id: int, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    query = select(func.sum(Operation.amount)).where(Operation.user_id == user.id, Operation.wallet_id == wallet_id).filter(Operation.type_operation.in_(["profit", "loss"])).group_by(Operation.type_operation)
+@cached(expire=120, scopes=["wallet:{wallet_id}"])
+async def get_profit_and_loss(wallet_id: int, category: Optional[Category] = None, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    query = select(
+        func.coalesce(func.sum(OperationAggregate.total).filter(OperationAggregate.type_operation == TypeOperation.profit), 0),
+        func.coalesce(func.sum(OperationAggregate.total).filter(OperationAggregate.type_operation == TypeOperation.loss), 0),
+    ).where(OperationAggregate.user_id == user.id, OperationAggregate.wallet_id == wallet_id)
+    if category is not None:
+        query = query.where(OperationAggregate.category == category)
     result = await session.execute(query)
-    loss, profit = result.scalars().all()
+    profit, loss = result.one()
 
     return {"profit": profit, "loss": loss}
+
+@router.get("/get_consolidated_profit_and_loss")
+async def get_consolidated_profit_and_loss(currency: str = Query(default=settings.BASE_CURRENCY, pattern=r"^[A-Z]{3}$"), category: Optional[Category] = None, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    # Profit and loss over all of the user's wallets, converted to `currency` at the current rates.
+    rates = await get_rates(session)
+    converted = select(
+        OperationAggregate.type_operation,
+        Wallet.currency,
+        convert(OperationAggregate.total, Wallet.currency, rates, currency).label("amount"),
+    ).join(Wallet, Wallet.id == OperationAggregate.wallet_id).where(OperationAggregate.user_id == user.id)
+    if category is not None:
+        converted = converted.where(OperationAggregate.category == category)
+    converted = converted.subquery()
+    query = select(
+        func.coalesce(func.round(func.sum(converted.c.amount).filter(converted.c.type_operation == TypeOperation.profit), 2), 0),
+        func.coalesce(func.round(func.sum(converted.c.amount).filter(converted.c.type_operation == TypeOperation.loss), 2), 0),
+        func.array_agg(distinct(converted.c.currency)).filter(converted.c.amount.is_(None)),
+    )
+    profit, loss, missing = (await session.execute(query)).one()
+    check_missing(missing)
+
+    return {"currency": currency, "profit": profit, "loss": loss}
@@ -1,20 +1,63 @@
+import enum
+
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from decimal import Decimal
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 from src.models.models import TypeOperation, Category
+from src.models.schemas import Money
 
 
 class OperationCreate(BaseModel):
     wallet_id: int
-    category: Optional[Category]
-    type_operation: Optional[TypeOperation]
-    amount: float 
+    category: Category
+    type_operation: TypeOperation
+    amount: Money
+    description: Optional[str] = Field(default=None, max_length=500)
+    merchant: Optional[str] = Field(default=None, max_length=128)
 
 class OperationRead(BaseModel):
     id: int
     wallet_id: int
     category: Optional[Category]
     type_operation: Optional[TypeOperation]
-    amount: float
+    amount: Money
+    currency: str
+    description: Optional[str] = None
+    merchant: Optional[str] = None
     created_at: datetime
+
+
+class OperationPage(BaseModel):
+    items: List[OperationRead]
+    next_cursor: Optional[str]
+
+
+class OperationImport(OperationCreate):
+    created_at: Optional[datetime] = None
+
+
+class ImportRejectedRow(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    accepted: int
+    rejected: int
+    rejected_rows: List[ImportRejectedRow]
+
+
+class ExportFormat(enum.Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+class AnalyticsRow(BaseModel):
+    period_start: datetime
+    category: Category
+    currency: str
+    profit: Decimal
+    loss: Decimal
+    operations_count: int
@@ -0,0 +1,29 @@
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column
+
+from src.models.models import OPERATION_SEARCH_VECTOR
+
+
+MAX_TERMS = 8
+
+_search_vector = literal_column(OPERATION_SEARCH_VECTOR)
+
+
+def prefix_query(text: str) -> str:
+    """
+    Turn free text into a to_tsquery string matching every word as a prefix.
+
+    Only word characters are kept, so user input cannot inject tsquery
+    operators: "Pharm 24" becomes "pharm:* & 24:*".
+    """
+    terms = re.findall(r"\w+", text.lower())[:MAX_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no words.")
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def matches(text: str):
+    """WHERE clause for operations whose merchant or description match ``text``; uses ix_operation_search."""
+    return _search_vector.op("@@")(func.to_tsquery(literal_column("'simple'::regconfig"), prefix_query(text)))
@@ -0,0 +1,138 @@
+import asyncio
+import datetime
+import logging
+
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import evict, invalidate
+from src.config import settings
+from src.database import async_session_maker
+from src.metrics import registry
+from src.models.models import OutboxEvent
+
+
+logger = logging.getLogger(__name__)
+
+events_processed = registry.counter("moneybase_outbox_events_processed_total", "Outbox events consumed, by kind.")
+outbox_lag = registry.gauge("moneybase_outbox_lag_seconds", "Age of the oldest outbox event not yet consumed.")
+
+INVALIDATE = "invalidate"
+
+# kind -> handler for every event kind other than cache invalidation.
+handlers: Dict[str, Callable[[OutboxEvent], Awaitable[None]]] = {}
+
+# session.info key of the invalidations emitted in the session, evicted by ``committed``.
+_PENDING = "outbox_invalidations"
+
+# Set after a commit that wrote events, so this process's consumer runs now instead of at its next poll.
+_wakeup = asyncio.Event()
+
+
+def handler(kind: str):
+    """Register the consumer of ``kind`` events. Delivery is at-least-once: handlers must be idempotent."""
+    def wrapper(func):
+        handlers[kind] = func
+        return func
+    return wrapper
+
+
+async def emit(session: AsyncSession, kind: str, user_id: Optional[int] = None, payload: Optional[dict] = None) -> None:
+    """Record an event in the caller's transaction; it is delivered once that commits."""
+    await session.execute(insert(OutboxEvent).values(user_id=user_id, kind=kind, payload=payload or {}))
+
+
+async def emit_invalidation(session: AsyncSession, user_id: int, scopes: Iterable[str]) -> None:
+    await emit_invalidations(session, {user_id: scopes})
+
+
+async def emit_invalidations(session: AsyncSession, scopes: Dict[int, Iterable[str]]) -> None:
+    """One invalidation event per user, in a single executemany."""
+    if scopes:
+        rows = [{"user_id": user_id, "kind": INVALIDATE, "payload": {"scopes": sorted(set(user_scopes))}} for user_id, user_scopes in scopes.items()]
+        await session.execute(insert(OutboxEvent), rows)
+        pending = session.info.setdefault(_PENDING, defaultdict(set))
+        for user_id, user_scopes in scopes.items():
+            pending[user_id].update(user_scopes)
+
+
+def notify() -> None:
+    _wakeup.set()
+
+
+async def committed(session: AsyncSession) -> None:
+    """
+    Call after committing events: evicts the session's invalidations right
+    away, best-effort, and wakes this process's consumer. The events stay
+    queued, so an eviction lost to a Redis error is retried on delivery.
+    """
+    for user_id, scopes in session.info.pop(_PENDING, {}).items():
+        await invalidate(user_id, *scopes)
+    notify()
+
+
+async def consume(session: AsyncSession, batch_size: int) -> int:
+    """
+    Deliver up to ``batch_size`` events and delete them, in one transaction.
+
+    Invalidations are merged per user into one eviction. Events are locked
+    with SKIP LOCKED, so every API process and the worker can consume side by
+    side. Only kinds this process has a handler for are taken: the others stay
+    queued for a process that registered one, without blocking the events
+    behind them. A failing delivery rolls the whole batch back for a retry.
+    Returns the number of events delivered.
+    """
+    deliverable = OutboxEvent.kind.in_([INVALIDATE, *handlers])
+    # Measured before delivering, so the lag keeps growing while deliveries fail.
+    oldest = (await session.execute(select(OutboxEvent.created_at).where(deliverable).order_by(OutboxEvent.id).limit(1))).scalar()
+    outbox_lag.set(0 if oldest is None else (datetime.datetime.utcnow() - oldest).total_seconds())
+
+    query = (
+        select(OutboxEvent)
+        .where(deliverable)
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    events = (await session.execute(query)).scalars().all()
+    if not events:
+        return 0
+
+    scopes: Dict[int, Set[str]] = defaultdict(set)
+    for event in events:
+        if event.kind == INVALIDATE:
+            scopes[event.user_id].update(event.payload["scopes"])
+        else:
+            await handlers[event.kind](event)
+    for user_id, user_scopes in scopes.items():
+        await evict(user_id, *user_scopes)
+
+    await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in events])))
+    await session.commit()
+    for event in events:
+        events_processed.inc(kind=event.kind)
+    return len(events)
+
+
+async def run_consumer(poll_seconds: float = settings.OUTBOX_POLL_SECONDS, batch_size: int = settings.OUTBOX_BATCH_SIZE) -> None:
+    """Consume events forever: on notify() from this process, or every ``poll_seconds`` for the others."""
+    while True:
+        _wakeup.clear()
+        try:
+            while True:
+                async with async_session_maker() as session:
+                    consumed = await consume(session, batch_size)
+                if consumed < batch_size:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("outbox consumer failed")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+
@@ -0,0 +1,37 @@
+import base64
+import datetime
+
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+
+
+def encode_cursor(created_at: datetime.datetime, id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(created_at), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def keyset(query: Select, created_at_column, id_column, cursor: Optional[str], limit: int) -> Select:
+    """
+    Restrict ``query`` to the page after ``cursor``, newest first.
+
+    One extra row is fetched so ``page`` can tell whether another page exists.
+    """
+    if cursor:
+        query = query.where(tuple_(created_at_column, id_column) < decode_cursor(cursor))
+    return query.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def page(rows: Sequence, limit: int) -> Tuple[Sequence, Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
@@ -0,0 +1,59 @@
+import datetime
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.auth import current_user
+from src.database import get_async_session
+from src.models.models import RecurringOperation, User, Wallet
+from src.operations.analytics import to_utc
+from src.recurring.scheduler import first_run
+from src.recurring.schemas import RecurringCreate, RecurringRead
+
+
+# A starts_at this far in the past (client clock, slow form) still gets its first run posted.
+START_GRACE = datetime.timedelta(hours=1)
+
+router = APIRouter(
+    prefix="/recurring",
+    tags=["Recurring operations"]
+)
+
+
+@router.post("/add_recurring", response_model=RecurringRead)
+async def add_recurring(data_recurring: RecurringCreate, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    query = select(Wallet.id).where(Wallet.id == data_recurring.wallet_id, Wallet.user_id == user.id)
+    if (await session.execute(query)).scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Wallet not found.")
+
+    data = data_recurring.dict()
+    data["user_id"] = user.id
+    data["starts_at"] = to_utc(data_recurring.starts_at)
+    # The first run is starts_at itself, or for a schedule started in the past
+    # its first run from now on: history is not backfilled. The scheduler posts it once it is due.
+    data["next_run_at"] = first_run(data["starts_at"], data_recurring.interval, datetime.datetime.utcnow() - START_GRACE)
+    result = await session.execute(insert(RecurringOperation).values(data).returning(RecurringOperation))
+    recurring = result.scalar_one()
+    await session.commit()
+    return recurring
+
+
+@router.get("/get_recurring", response_model=List[RecurringRead])
+async def get_recurring(user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    query = select(RecurringOperation).where(RecurringOperation.user_id == user.id).order_by(RecurringOperation.id)
+    result = await session.execute(query)
+    return result.scalars().all()
+
+
+@router.post("/delete_recurring")
+async def delete_recurring(recurring_id: int, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    # Operations already posted by the schedule are kept.
+    stmt = delete(RecurringOperation).where(RecurringOperation.id == recurring_id, RecurringOperation.user_id == user.id).returning(RecurringOperation.id)
+    result = await session.execute(stmt)
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Recurring operation not found.")
+    await session.commit()
+    return {"status": "success"}
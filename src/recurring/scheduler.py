@@ -0,0 +1,152 @@
+import asyncio
+import calendar
+import datetime
+import logging
+
+from collections import defaultdict
+from typing import Dict, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import outbox
+from src.config import settings
+from src.database import async_session_maker
+from src.metrics import registry
+from src.models.models import Interval, Operation, RecurringOperation, Wallet
+from src.operations.aggregates import apply_operations
+from src.operations.analytics import month_scope
+
+
+logger = logging.getLogger(__name__)
+
+posted_operations = registry.counter("moneybase_recurring_operations_posted_total", "Operations materialized from recurring schedules.")
+
+operation_table = Operation.__table__
+
+
+def next_run(starts_at: datetime.datetime, interval: Interval, run_at: datetime.datetime) -> datetime.datetime:
+    """The run after ``run_at``; monthly runs stay on the day of ``starts_at``, clamped to the month's end."""
+    if interval == Interval.daily:
+        return run_at + datetime.timedelta(days=1)
+    if interval == Interval.weekly:
+        return run_at + datetime.timedelta(weeks=1)
+    year, month = divmod(run_at.month, 12)
+    year += run_at.year
+    month += 1
+    return run_at.replace(year=year, month=month, day=min(starts_at.day, calendar.monthrange(year, month)[1]))
+
+
+def first_run(starts_at: datetime.datetime, interval: Interval, now: datetime.datetime) -> datetime.datetime:
+    """The first run on or after ``now`` of a schedule starting at ``starts_at``; earlier runs are not backfilled."""
+    if starts_at >= now:
+        return starts_at
+    if interval != Interval.monthly:
+        step = datetime.timedelta(days=1) if interval == Interval.daily else datetime.timedelta(weeks=1)
+        return starts_at + step * -((starts_at - now) // step)
+    run_at = starts_at
+    while run_at < now:
+        run_at = next_run(starts_at, interval, run_at)
+    return run_at
+
+
+def idempotency_key(recurring_id: int, run_at: datetime.datetime) -> str:
+    return f"recurring:{recurring_id}:{run_at.isoformat()}"
+
+
+async def run_due(session: AsyncSession, now: datetime.datetime, batch_size: int, max_catch_up: int) -> int:
+    """
+    Materialize the operations of up to ``batch_size`` due schedules in one transaction.
+
+    Schedules are claimed with FOR UPDATE SKIP LOCKED, so several workers can
+    run side by side. A schedule that missed runs (worker down) posts up to
+    ``max_catch_up`` of them per batch. Every operation carries an idempotency
+    key, and only rows that were actually inserted touch budgets and
+    aggregates. Returns the number of schedules processed.
+    """
+    query = select(
+        RecurringOperation.id,
+        RecurringOperation.user_id,
+        RecurringOperation.wallet_id,
+        RecurringOperation.category,
+        RecurringOperation.type_operation,
+        RecurringOperation.amount,
+        RecurringOperation.interval,
+        RecurringOperation.starts_at,
+        RecurringOperation.next_run_at,
+        Wallet.currency,
+    ).join(Wallet, Wallet.id == RecurringOperation.wallet_id).where(
+        RecurringOperation.is_active, RecurringOperation.next_run_at <= now
+    ).order_by(RecurringOperation.next_run_at).limit(batch_size).with_for_update(of=RecurringOperation, skip_locked=True)
+    schedules = (await session.execute(query)).all()
+    if not schedules:
+        return 0
+
+    rows = []
+    progress = []
+    for schedule in schedules:
+        run_at = schedule.next_run_at
+        last_run_at = None
+        for _ in range(max_catch_up):
+            if run_at > now:
+                break
+            rows.append({
+                "user_id": schedule.user_id,
+                "wallet_id": schedule.wallet_id,
+                "category": schedule.category,
+                "type_operation": schedule.type_operation,
+                "amount": schedule.amount,
+                "currency": schedule.currency,
+                "idempotency_key": idempotency_key(schedule.id, run_at),
+                "created_at": run_at,
+            })
+            last_run_at = run_at
+            run_at = next_run(schedule.starts_at, schedule.interval, run_at)
+        progress.append({"id": schedule.id, "next_run_at": run_at, "last_run_at": last_run_at})
+
+    # executemany with RETURNING: SQLAlchemy sends the rows as multi-VALUES pages.
+    stmt = pg_insert(operation_table).on_conflict_do_nothing(
+        index_elements=[operation_table.c.idempotency_key, operation_table.c.created_at],
+        index_where=operation_table.c.idempotency_key.isnot(None),
+    ).returning(
+        operation_table.c.user_id,
+        operation_table.c.wallet_id,
+        operation_table.c.category,
+        operation_table.c.type_operation,
+        operation_table.c.amount,
+        operation_table.c.created_at,
+    )
+    inserted = (await session.execute(stmt, rows)).mappings().all()
+    await apply_operations(session, inserted)
+    await session.execute(update(RecurringOperation), progress)
+    scopes: Dict[int, Set[str]] = defaultdict(lambda: {"wallets", "operations", "budgets"})
+    for operation in inserted:
+        scopes[operation["user_id"]].update((f"wallet:{operation['wallet_id']}", month_scope(operation["created_at"])))
+    await outbox.emit_invalidations(session, scopes)
+    await session.commit()
+    await outbox.committed(session)
+
+    posted_operations.inc(len(inserted))
+    return len(schedules)
+
+
+async def run_scheduler(
+    poll_seconds: float = settings.RECURRING_POLL_SECONDS,
+    batch_size: int = settings.RECURRING_BATCH_SIZE,
+    max_catch_up: int = settings.RECURRING_MAX_CATCH_UP,
+) -> None:
+    """Poll for due schedules forever, draining full batches back to back."""
+    while True:
+        try:
+            now = datetime.datetime.utcnow()
+            while True:
+                async with async_session_maker() as session:
+                    processed = await run_due(session, now, batch_size, max_catch_up)
+                if processed < batch_size:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("recurring scheduler run failed")
+        await asyncio.sleep(poll_seconds)
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from src.models.models import Category, Interval, TypeOperation
+from src.models.schemas import Money
+
+
+class RecurringCreate(BaseModel):
+    wallet_id: int
+    category: Category
+    type_operation: TypeOperation
+    amount: Money
+    interval: Interval
+    starts_at: datetime
+
+
+class RecurringRead(RecurringCreate):
+    id: int
+    next_run_at: datetime
+    last_run_at: Optional[datetime]
+    is_active: bool
@@ -0,0 +1,19 @@
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+class RawJSONResponse(Response):
+    """Response whose body is already serialized JSON; FastAPI sends it as-is."""
+
+    media_type = "application/json"
+
+
+def typed_response(adapter: TypeAdapter, data: Any) -> RawJSONResponse:
+    """
+    Validate ``data`` once with ``adapter`` and serialize it straight to bytes.
+
+    ``data`` may hold ORM objects or rows: attributes are read directly.
+    """
+    return RawJSONResponse(content=adapter.dump_json(adapter.validate_python(data, from_attributes=True)))
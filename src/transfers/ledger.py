@@ -0,0 +1,79 @@
+import decimal
+
+from collections import defaultdict
+from typing import List, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, Numeric, String, case, column, func, insert, literal, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Transfer, Wallet
+from src.transfers.schemas import TransferCreate
+
+
+async def post_transfers(session: AsyncSession, user_id: int, transfers: Sequence[TransferCreate]) -> List:
+    """
+    Record ``transfers`` and move the money, in one statement and the caller's transaction.
+
+    The statement locks every wallet involved in id order (so two batches over
+    the same wallets cannot deadlock), applies the net change of each wallet
+    with a single UPDATE and inserts the transfer rows. Raises 404 when a wallet
+    is not the user's and 422 when the two wallets of a transfer have different
+    currencies, leaving the transaction to be rolled back. Returns the inserted (id, created_at) rows in input order.
+    """
+    deltas = defaultdict(decimal.Decimal)
+    for transfer in transfers:
+        deltas[transfer.from_wallet_id] -= transfer.amount
+        deltas[transfer.to_wallet_id] += transfer.amount
+
+    locked = (
+        select(Wallet.id, Wallet.currency)
+        .where(Wallet.id.in_(deltas), Wallet.user_id == user_id)
+        .order_by(Wallet.id)
+        .with_for_update()
+        .cte("locked")
+    )
+    moved = (
+        update(Wallet)
+        .where(Wallet.id == locked.c.id)
+        .values(budget=Wallet.budget + case(deltas, value=Wallet.id), version=Wallet.version + 1)
+        .returning(Wallet.id)
+        .cte("moved")
+    )
+    legs = values(
+        column("position", Integer),
+        column("from_wallet_id", Integer),
+        column("to_wallet_id", Integer),
+        column("amount", Numeric(14, 2)),
+        column("description", String),
+        name="legs",
+    ).data([
+        (position, transfer.from_wallet_id, transfer.to_wallet_id, transfer.amount, transfer.description)
+        for position, transfer in enumerate(transfers)
+    ])
+    source, target = locked.alias("source"), locked.alias("target")
+    # Reading `moved` makes the insert wait for the budget update; rows are
+    # only inserted when every wallet was locked and moved, and only for legs
+    # within one currency.
+    inserted = (
+        insert(Transfer)
+        .from_select(
+            ["user_id", "from_wallet_id", "to_wallet_id", "amount", "description"],
+            select(literal(user_id, Integer), legs.c.from_wallet_id, legs.c.to_wallet_id, legs.c.amount, legs.c.description)
+            .join(source, source.c.id == legs.c.from_wallet_id)
+            .join(target, target.c.id == legs.c.to_wallet_id)
+            .where(select(func.count()).select_from(moved).scalar_subquery() == len(deltas), source.c.currency == target.c.currency)
+            .order_by(legs.c.position),
+        )
+        .returning(Transfer.id, Transfer.created_at)
+        .cte("inserted")
+    )
+    query = select(inserted.c.id, inserted.c.created_at).order_by(inserted.c.id)
+    rows = (await session.execute(query)).all()
+    if len(rows) != len(transfers):
+        # Only failures pay for telling the two causes apart.
+        query = select(func.count()).where(Wallet.id.in_(deltas), Wallet.user_id == user_id)
+        if (await session.execute(query)).scalar_one() == len(deltas):
+            raise HTTPException(status_code=422, detail="Transfers between wallets of different currencies are not supported.")
+        raise HTTPException(status_code=404, detail="Wallet not found.")
+    return rows
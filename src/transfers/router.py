@@ -0,0 +1,58 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import TypeAdapter
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.auth import current_user
+from src import outbox
+from src.cache import cached
+from src.database import get_async_session
+from src.models.models import Transfer, User
+from src.pagination import keyset, page
+from src.responses import typed_response
+from src.transfers.ledger import post_transfers
+from src.transfers.schemas import TransferBatch, TransferCreate, TransferPage, TransferRead
+
+
+router = APIRouter(
+    prefix="/transfer",
+    tags=["Transfers"]
+)
+
+
+async def _post(session: AsyncSession, user: User, transfers: List[TransferCreate]) -> List[TransferRead]:
+    rows = await post_transfers(session, user.id, transfers)
+    wallet_ids = {wallet_id for transfer in transfers for wallet_id in (transfer.from_wallet_id, transfer.to_wallet_id)}
+    await outbox.emit_invalidation(session, user.id, ["wallets", "transfers", *[f"wallet:{wallet_id}" for wallet_id in wallet_ids]])
+    await session.commit()
+    await outbox.committed(session)
+
+    return [TransferRead(id=row.id, created_at=row.created_at, **transfer.model_dump()) for row, transfer in zip(rows, transfers)]
+
+
+@router.post("/make_transfer", response_model=TransferRead)
+async def make_transfer(data_transfer: TransferCreate, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    (transfer,) = await _post(session, user, [data_transfer])
+    return transfer
+
+
+@router.post("/make_transfers", response_model=List[TransferRead])
+async def make_transfers(data_transfers: TransferBatch, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    # All or nothing: one statement and one commit for the whole batch.
+    return await _post(session, user, data_transfers.transfers)
+
+
+_page_adapter = TypeAdapter(TransferPage)
+
+@router.get("/get_transfers", response_model=TransferPage)
+@cached(expire=120, scopes=["transfers"])
+async def get_transfers(wallet_id: Optional[int] = None, limit: int = Query(default=20, ge=1, le=500), cursor: Optional[str] = None, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    query = select(Transfer).where(Transfer.user_id == user.id)
+    if wallet_id is not None:
+        query = query.where(or_(Transfer.from_wallet_id == wallet_id, Transfer.to_wallet_id == wallet_id))
+    res = await session.execute(keyset(query, Transfer.created_at, Transfer.id, cursor, limit))
+    rows, next_cursor = page(res.scalars().all(), limit)
+
+    return typed_response(_page_adapter, {"items": rows, "next_cursor": next_cursor})
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Annotated, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from src.models.schemas import Money
+
+
+class TransferCreate(BaseModel):
+    from_wallet_id: int
+    to_wallet_id: int
+    amount: Annotated[Money, Field(gt=0)]
+    description: Optional[str] = Field(default=None, max_length=500)
+
+    @model_validator(mode="after")
+    def distinct_wallets(self):
+        if self.from_wallet_id == self.to_wallet_id:
+            raise ValueError("from_wallet_id and to_wallet_id must differ")
+        return self
+
+
+class TransferBatch(BaseModel):
+    transfers: List[TransferCreate] = Field(min_length=1, max_length=1000)
+
+
+class TransferRead(TransferCreate):
+    id: int
+    created_at: datetime
+
+
+class TransferPage(BaseModel):
+    items: List[TransferRead]
+    next_cursor: Optional[str]
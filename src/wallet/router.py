@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi_cache import FastAPICache
-from fastapi_cache.decorator import cache
+from typing import List
 
-from sqlalchemy import delete, insert, select, update
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import TypeAdapter
+
+from sqlalchemy import delete, distinct, func, insert, select, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import contains_eager
 
+from src import outbox
+from src.cache import cached
+from src.config import settings
+from src.currency.rates import check_missing, convert, get_rates
 from src.database import get_async_session
 from src.auth.auth import current_user
-from src.wallet.schemas import WalletCreate, WalletReadDTO, WalletRead
+from src.wallet.schemas import WalletCreate, WalletReadDTO, WalletUpdate
 from src.models.models import User, Wallet, Operation
+from src.responses import typed_response
 
 router = APIRouter(
     prefix="/wallet",
@@ -18,72 +23,118 @@ router = APIRouter(
 
 @router.post("/create_wallet")
 async def create_wallet(data_wallet: WalletCreate, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    print(data_wallet)
     data = data_wallet.dict()
     data["user_id"] = user.id
-    print(data)
     stmt = insert(Wallet).values(data)
 
     await session.execute(stmt)
+    await outbox.emit_invalidation(session, user.id, ["wallets"])
     await session.commit()
+    await outbox.committed(session)
 
-    await FastAPICache().clear()
-    
     return {"status": "success"}
 
 
 
 
-@router.get("/get_wallets")
-@cache(expire=120)
-async def get_wallets(user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    subq = select(Operation.id).filter(Operation.wallet_id == Wallet.id).limit(4).order_by(Operation.created_at.desc()).scalar_subquery().correlate(Wallet)
-    query = select(Wallet).outerjoin(Operation, Operation.id.in_(subq)).where(Wallet.user_id == user.id).options(contains_eager(Wallet.operations))
+_wallets_adapter = TypeAdapter(List[WalletReadDTO])
+
+@router.get("/get_wallets", response_model=List[WalletReadDTO])
+@cached(expire=120, scopes=["wallets"])
+async def get_wallets(operations: int = Query(default=4, ge=0, le=50), user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    # LATERAL runs one (wallet_id, created_at, id) index scan of `operations` rows per wallet.
+    recent = (
+        select(
+            Operation.id.label("operation_id"),
+            Operation.category,
+            Operation.type_operation,
+            Operation.amount,
+            Operation.currency.label("operation_currency"),
+            Operation.description,
+            Operation.merchant,
+            Operation.created_at,
+        )
+        .where(Operation.wallet_id == Wallet.id)
+        .order_by(Operation.created_at.desc(), Operation.id.desc())
+        .limit(operations)
+        .lateral()
+    )
+    query = (
+        select(Wallet.id, Wallet.name, Wallet.budget, Wallet.currency, Wallet.version, recent)
+        .outerjoin(recent, true())
+        .where(Wallet.user_id == user.id)
+        .order_by(Wallet.id, recent.c.created_at.desc(), recent.c.operation_id.desc())
+    )
     res = await session.execute(query)
-    result_orm = res.unique().scalars().all()
-    
-    result = [WalletReadDTO.model_validate(row, from_attributes=True) for row in result_orm]
 
-    return result
+    wallets = {}
+    for row in res:
+        wallet = wallets.get(row.id)
+        if wallet is None:
+            wallet = wallets[row.id] = {"id": row.id, "name": row.name, "budget": row.budget, "currency": row.currency, "version": row.version, "operations": []}
+        if row.operation_id is not None:
+            wallet["operations"].append({
+                "id": row.operation_id,
+                "wallet_id": row.id,
+                "category": row.category,
+                "type_operation": row.type_operation,
+                "amount": row.amount,
+                "currency": row.operation_currency,
+                "description": row.description,
+                "merchant": row.merchant,
+                "created_at": row.created_at,
+            })
+
+    return typed_response(_wallets_adapter, list(wallets.values()))
+
+
+@router.get("/get_consolidated_balance")
+async def get_consolidated_balance(currency: str = Query(default=settings.BASE_CURRENCY, pattern=r"^[A-Z]{3}$"), user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    # Not cached: a rate load changes it for every user at once, and it is one pass over the user's wallets.
+    rates = await get_rates(session)
+    converted = select(Wallet.currency, convert(Wallet.budget, Wallet.currency, rates, currency).label("amount")).where(Wallet.user_id == user.id).subquery()
+    query = select(
+        func.coalesce(func.round(func.sum(converted.c.amount), 2), 0),
+        func.array_agg(distinct(converted.c.currency)).filter(converted.c.amount.is_(None)),
+    )
+    balance, missing = (await session.execute(query)).one()
+    check_missing(missing)
+
+    return {"currency": currency, "balance": balance}
 
 
 @router.post("/change_wallet")
-async def change_wallet(data_wallet: WalletRead, wallet_id: int, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    try:
-        query = select(Wallet).where(Wallet.id == wallet_id)
-        result = await session.execute(query)
-        if result.scalar().user_id == user.id:
-            data = data_wallet.dict()
-            data["id"] = wallet_id
-            stmt = update(Wallet).where(Wallet.id == wallet_id).values(data)
-
-            await session.execute(stmt)
-            await session.commit()
-
-            await FastAPICache().clear()
-            return {"status": "success"}
-        else:
-            raise Exception
-        
-    except Exception as e:
-        return {"status": "not your wallet"}
+async def change_wallet(data_wallet: WalletUpdate, wallet_id: int, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
+    # Compare-and-swap: the overwrite only lands if no operation or other change
+    # touched the wallet since the client read `version`. Relative budget
+    # updates never wait on this, they just bump the version.
+    stmt = (
+        update(Wallet)
+        .where(Wallet.id == wallet_id, Wallet.user_id == user.id, Wallet.version == data_wallet.version)
+        .values(name=data_wallet.name, budget=data_wallet.budget, version=Wallet.version + 1)
+        .returning(Wallet.version)
+    )
+    result = await session.execute(stmt)
+    version = result.scalar_one_or_none()
+    if version is None:
+        query = select(Wallet.version).where(Wallet.id == wallet_id, Wallet.user_id == user.id)
+        if (await session.execute(query)).scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Wallet not found.")
+        raise HTTPException(status_code=409, detail="Wallet was changed concurrently, reload it and retry.")
+    await outbox.emit_invalidation(session, user.id, ["wallets"])
+    await session.commit()
+    await outbox.committed(session)
+
+    return {"status": "success", "version": version}
 
 @router.post("/delete_wallet")
 async def delete_wallet(wallet_id: int, user: User = Depends(current_user), session: AsyncSession = Depends(get_async_session)):
-    try:
-        query = select(Wallet).where(Wallet.id == wallet_id)
-        result = await session.execute(query)
-
-        if result.scalar().user_id == user.id:
-            stmt = delete(Wallet).where(Wallet.id == wallet_id)
-            
-            await session.execute(stmt)
-            await session.commit()
-            
-            await FastAPICache().clear()
-            return {"status": "success"}
-        else:
-            raise Exception
-        
-    except Exception as e:
-        return {"status": "not your wallet", "detail": f"e"}
+    stmt = delete(Wallet).where(Wallet.id == wallet_id, Wallet.user_id == user.id).returning(Wallet.id)
+    result = await session.execute(stmt)
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Wallet not found.")
+
+    await outbox.emit_invalidation(session, user.id, ["wallets", "operations", f"wallet:{wallet_id}", "analytics", "transfers", "budgets"])
+    await session.commit()
+    await outbox.committed(session)
+    return {"status": "success"}
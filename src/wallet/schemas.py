@@ -2,14 +2,25 @@ from typing import List
 
 from pydantic import BaseModel
 
+from src.config import settings
+from src.models.schemas import Currency, Money
 from src.operations.schemas import OperationRead
 
-class WalletCreate(BaseModel):
+class WalletBase(BaseModel):
     name: str
-    budget: float
+    budget: Money
+
+class WalletCreate(WalletBase):
+    # Cannot be changed later: budgets, limits and operations are all in it.
+    currency: Currency = settings.BASE_CURRENCY
+
+class WalletUpdate(WalletBase):
+    # The version the client read; the update is rejected if the wallet changed since.
+    version: int
 
 class WalletRead(WalletCreate):
     id: int
+    version: int
 
 class WalletReadDTO(WalletRead):
-    operations: List["OperationRead"]
\ No newline at end of file
+    operations: List["OperationRead"]
@@ -0,0 +1,24 @@
+import asyncio
+import logging
+
+from redis import asyncio as aioredis
+
+import src.auth.manager  # registers its outbox handlers
+from src.cache import init_cache
+from src.config import settings
+from src.operations.partitions import maintain_partitions
+from src.outbox import run_consumer
+from src.recurring.scheduler import run_scheduler
+
+
+logging.basicConfig(level=settings.LOG_LEVEL)
+
+
+async def main() -> None:
+    redis = aioredis.from_url("redis://localhost", encoding="utf8", decode_responses=True)
+    init_cache(redis, prefix="moneybase-cache")
+    await asyncio.gather(run_scheduler(), maintain_partitions(), run_consumer())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Token revocation tests: shared revocations through Redis, and failing closed
+while Redis is unreachable.
+
+    pip install -r tests/requirements.txt
+    python -m unittest discover tests
+"""
+import os
+import time
+import unittest
+
+from unittest import mock
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+import fakeredis.aioredis
+
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+
+from src.auth import auth
+from src.auth.cache import UserCache
+from src.config import settings
+from src.models.models import User
+
+
+class DownRedis:
+    async def mget(self, keys):
+        raise ConnectionError("Connection refused")
+
+    async def set(self, *args, **kwargs):
+        raise ConnectionError("Connection refused")
+
+
+class FakeUserManager:
+    def __init__(self, user):
+        self.user = user
+        self.loads = 0
+
+    async def get(self, user_id):
+        self.loads += 1
+        return self.user
+
+
+def make_user():
+    return User(id=7, username="alice", email="alice@example.com", is_active=True, is_superuser=False, is_verified=False)
+
+
+class RevocationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = fakeredis.aioredis.FakeRedis()
+        self.first = UserCache(ttl=30, maxsize=10, token_lifetime=3600)
+        self.second = UserCache(ttl=30, maxsize=10, token_lifetime=3600)
+        self.first.init_redis(self.redis, prefix="test")
+        self.second.init_redis(self.redis, prefix="test")
+
+    async def test_user_revocation_applies_in_every_process(self):
+        issued_at = time.time() - 1
+        await self.first.revoke(7)
+        self.assertTrue(await self.second.is_revoked(7, issued_at, "a"))
+        self.assertFalse(await self.second.is_revoked(7, time.time() + 1, "a"))
+        self.assertFalse(await self.second.is_revoked(8, issued_at, "a"))
+
+    async def test_token_revocation_applies_in_every_process(self):
+        await self.first.revoke_token(7, "a", time.time() + 60)
+        self.assertTrue(await self.second.is_revoked(7, time.time(), "a"))
+        self.assertFalse(await self.second.is_revoked(7, time.time(), "b"))
+
+    async def test_unknown_while_redis_is_down(self):
+        cache = UserCache(ttl=30, maxsize=10, token_lifetime=3600)
+        cache.init_redis(DownRedis(), prefix="test")
+        self.assertIsNone(await cache.is_revoked(7, time.time(), "a"))
+        await cache.revoke(7)
+        self.assertTrue(await cache.is_revoked(7, time.time() - 1, "a"))
+
+
+class ReadTokenTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = UserCache(ttl=30, maxsize=10, token_lifetime=3600)
+        self.cache.init_redis(DownRedis(), prefix="test")
+        patcher = mock.patch.object(auth, "user_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.strategy = auth.CachedJWTStrategy(secret="secret", lifetime_seconds=3600)
+        self.user = make_user()
+        self.token = await self.strategy.write_token(self.user)
+
+    async def test_loads_from_database_while_redis_is_down(self):
+        self.cache.set(self.user)
+        manager = FakeUserManager(self.user)
+        with mock.patch.object(settings, "AUTH_STATELESS", False):
+            user = await self.strategy.read_token(self.token, manager)
+        self.assertEqual(user.id, 7)
+        self.assertEqual(manager.loads, 1)
+
+    async def test_stateless_rejects_while_redis_is_down(self):
+        manager = FakeUserManager(self.user)
+        with mock.patch.object(settings, "AUTH_STATELESS", True):
+            with self.assertRaises(HTTPException) as raised:
+                await self.strategy.read_token(self.token, manager)
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(manager.loads, 0)
+
+    async def test_revoked_token_is_rejected(self):
+        self.cache.init_redis(fakeredis.aioredis.FakeRedis(), prefix="test")
+        await self.cache.revoke(7)
+        manager = FakeUserManager(self.user)
+        with mock.patch.object(settings, "AUTH_STATELESS", True):
+            self.assertIsNone(await self.strategy.read_token(self.token, manager))
+
+
+if __name__ == "__main__":
+    unittest.main()
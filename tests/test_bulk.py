@@ -0,0 +1,62 @@
+"""
+Streaming parsing of operation imports.
+
+    python -m unittest discover tests
+"""
+import os
+import unittest
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+from src.operations.bulk import iter_records
+
+
+class FakeRequest:
+    """A request whose body arrives in the given chunks."""
+
+    def __init__(self, content_type, chunks):
+        self.headers = {"content-type": content_type}
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+async def records(content_type, data, size=7):
+    return [record async for record in iter_records(FakeRequest(content_type, chunked(data, size)))]
+
+
+class CsvTest(unittest.IsolatedAsyncioTestCase):
+    async def test_rows_are_keyed_by_the_header(self):
+        data = "wallet_id, amount ,merchant\r\n1,10.50,Café\r\n\r\n2,3,\r\n".encode()
+        self.assertEqual(await records("text/csv; charset=utf-8", data), [
+            (1, {"wallet_id": "1", "amount": "10.50", "merchant": "Café"}, None),
+            (2, {"wallet_id": "2", "amount": "3"}, None),
+        ])
+
+    async def test_quoted_fields_may_span_lines(self):
+        data = b'wallet_id,description\n1,"first line\n\nsecond ""quoted"", line"\n2,plain\n'
+        self.assertEqual(await records("text/csv", data, size=5), [
+            (1, {"wallet_id": "1", "description": 'first line\n\nsecond "quoted", line'}, None),
+            (2, {"wallet_id": "2", "description": "plain"}, None),
+        ])
+
+    async def test_last_line_without_newline(self):
+        self.assertEqual(await records("text/csv", b"wallet_id,amount\n1,2"), [(1, {"wallet_id": "1", "amount": "2"}, None)])
+
+    async def test_unterminated_quote_is_reported(self):
+        data = b'wallet_id,description\n1,ok\n2,"never closed\n3,lost\n'
+        self.assertEqual(await records("text/csv", data), [
+            (1, {"wallet_id": "1", "description": "ok"}, None),
+            (2, None, "Unterminated quoted field."),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Response cache tests against fakeredis: single flight, stale refresh, the
+cross-process lock and tag eviction.
+
+    pip install -r tests/requirements.txt
+    python -m unittest discover tests
+"""
+import asyncio
+import json
+import os
+import time
+import unittest
+
+from types import SimpleNamespace
+from unittest import mock
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+import fakeredis.aioredis
+
+from src import cache
+from src.config import settings
+
+
+USER = SimpleNamespace(id=1)
+
+
+def body(response):
+    """The JSON of a handler result or of a response served from the cache."""
+    return json.loads(response.body) if hasattr(response, "body") else response
+
+
+class CacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        cache.init_cache(self.redis, prefix="test")
+        self.addCleanup(setattr, cache, "_redis", None)
+        self.calls = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.fail = None
+
+        @cache.cached(expire=60, scopes=["wallets", "wallet:{wallet_id}"])
+        async def get_wallet(wallet_id: int, user):
+            self.calls += 1
+            await self.gate.wait()
+            if self.fail is not None:
+                raise self.fail
+            return {"wallet_id": wallet_id, "calls": self.calls}
+
+        self.get_wallet = get_wallet
+
+    def key(self, wallet_id):
+        return cache._key(USER.id, "get_wallet", {"wallet_id": wallet_id, "user": USER})
+
+    async def test_hit_serves_the_stored_entry(self):
+        self.assertEqual(body(await self.get_wallet(wallet_id=1, user=USER)), {"wallet_id": 1, "calls": 1})
+        self.assertEqual(body(await self.get_wallet(wallet_id=1, user=USER)), {"wallet_id": 1, "calls": 1})
+        self.assertEqual(self.calls, 1)
+
+    async def test_concurrent_misses_share_one_result(self):
+        self.gate.clear()
+        requests = [asyncio.create_task(self.get_wallet(wallet_id=1, user=USER)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        self.gate.set()
+        results = await asyncio.gather(*requests)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual([body(result) for result in results], [{"wallet_id": 1, "calls": 1}] * 5)
+        self.assertEqual(cache._inflight, {})
+
+    async def test_concurrent_misses_share_one_exception(self):
+        self.gate.clear()
+        self.fail = ValueError("boom")
+        requests = [asyncio.create_task(self.get_wallet(wallet_id=1, user=USER)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        self.gate.set()
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(result is self.fail for result in results))
+        self.assertIsNone(await self.redis.get(self.key(1)))
+
+    async def test_cancelled_leader_lets_a_waiter_compute(self):
+        self.gate.clear()
+        leader = asyncio.create_task(self.get_wallet(wallet_id=1, user=USER))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(self.get_wallet(wallet_id=1, user=USER))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        self.gate.set()
+        self.assertEqual(body(await waiter), {"wallet_id": 1, "calls": 2})
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(cache._inflight, {})
+
+    async def test_stale_entry_is_served_while_refreshing(self):
+        await self.redis.set(self.key(1), f"{time.time() - 1:.3f}:" + json.dumps({"wallet_id": 1, "calls": 0}))
+        self.assertEqual(body(await self.get_wallet(wallet_id=1, user=USER)), {"wallet_id": 1, "calls": 0})
+        await asyncio.gather(*cache._refreshes)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(body(await self.get_wallet(wallet_id=1, user=USER)), {"wallet_id": 1, "calls": 1})
+
+    async def test_lock_waiter_serves_the_other_process_entry(self):
+        key = self.key(1)
+        await self.redis.set(f"{key}:lock", "other process")
+
+        async def other_process():
+            await asyncio.sleep(0.1)
+            await self.redis.set(key, f"{time.time() + 60:.3f}:" + json.dumps({"wallet_id": 1, "calls": 0}))
+
+        with mock.patch.object(settings, "CACHE_LOCK", True), mock.patch.object(settings, "CACHE_LOCK_TIMEOUT", 1.0):
+            writer = asyncio.create_task(other_process())
+            self.assertEqual(body(await self.get_wallet(wallet_id=1, user=USER)), {"wallet_id": 1, "calls": 0})
+            await writer
+        self.assertEqual(self.calls, 0)
+
+    async def test_lock_waiter_computes_after_the_timeout(self):
+        await self.redis.set(f"{self.key(1)}:lock", "other process")
+        with mock.patch.object(settings, "CACHE_LOCK", True), mock.patch.object(settings, "CACHE_LOCK_TIMEOUT", 0.1):
+            self.assertEqual(body(await self.get_wallet(wallet_id=1, user=USER)), {"wallet_id": 1, "calls": 1})
+        # The other process's lock is left alone.
+        self.assertEqual(await self.redis.get(f"{self.key(1)}:lock"), "other process")
+
+    async def test_eviction_removes_only_the_tagged_entries(self):
+        await self.get_wallet(wallet_id=1, user=USER)
+        await self.get_wallet(wallet_id=2, user=USER)
+
+        await cache.evict(USER.id, "wallet:1")
+        self.assertIsNone(await self.redis.get(self.key(1)))
+        self.assertIsNotNone(await self.redis.get(self.key(2)))
+
+        await cache.evict(USER.id, "wallets")
+        self.assertIsNone(await self.redis.get(self.key(2)))
+        await self.get_wallet(wallet_id=2, user=USER)
+        self.assertEqual(self.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
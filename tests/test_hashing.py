@@ -0,0 +1,81 @@
+"""
+Admission control of the password hashing pool.
+
+    python -m unittest discover tests
+"""
+import asyncio
+import os
+import threading
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+from fastapi import HTTPException
+
+from src.auth import hashing
+from src.config import settings
+
+
+class RunTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        for patcher in (
+            mock.patch.object(hashing, "_executor", executor),
+            mock.patch.object(settings, "AUTH_HASH_WORKERS", 1),
+            mock.patch.object(settings, "AUTH_HASH_QUEUE", 1),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def block(self):
+        self.release.wait(5)
+        return "hashed"
+
+    async def settle(self):
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+
+    async def test_saturated_pool_rejects(self):
+        first = asyncio.create_task(hashing._run(self.block))
+        second = asyncio.create_task(hashing._run(self.block))
+        await self.settle()
+        with self.assertRaises(HTTPException) as raised:
+            await hashing._run(self.block)
+        self.assertEqual(raised.exception.status_code, 503)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(first, second), ["hashed", "hashed"])
+        await self.settle()
+        self.assertEqual(hashing._pending, 0)
+
+    async def test_cancelled_call_holds_its_slot_while_it_runs(self):
+        running = asyncio.create_task(hashing._run(self.block))
+        await self.settle()
+        running.cancel()
+        await self.settle()
+        # The hash is still running on the pool, so it still counts.
+        self.assertEqual(hashing._pending, 1)
+
+        queued = asyncio.create_task(hashing._run(self.block))
+        await self.settle()
+        with self.assertRaises(HTTPException):
+            await hashing._run(self.block)
+
+        # A call cancelled while queued never runs and frees its slot at once.
+        queued.cancel()
+        await self.settle()
+        self.assertEqual(hashing._pending, 1)
+
+        self.release.set()
+        await self.settle()
+        self.assertEqual(hashing._pending, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
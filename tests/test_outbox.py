@@ -0,0 +1,138 @@
+"""
+Outbox consumer tests against an in-memory stand-in for the session.
+
+    python -m unittest discover tests
+"""
+import datetime
+import os
+import unittest
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+from sqlalchemy import Delete, Insert, Select
+
+from src import outbox
+from src.models.models import OutboxEvent
+
+
+class FakeSession:
+    """Applies the consumer's SELECT (kind filter, id order, limit) and DELETE to a list of events."""
+
+    def __init__(self, events):
+        self.events = events
+        self.commits = 0
+        self.info = {}
+
+    async def execute(self, stmt, rows=None):
+        if isinstance(stmt, Insert):
+            return _Result([])
+        params = stmt.compile().params
+        if isinstance(stmt, Select):
+            kinds = params["kind_1"]
+            rows = sorted((event for event in self.events if event.kind in kinds), key=lambda event: event.id)
+            if stmt.selected_columns[0].name == "created_at":
+                rows = [event.created_at for event in rows]
+            return _Result(rows[:params["param_1"]])
+        if isinstance(stmt, Delete):
+            ids = set(params["id_1"])
+            self.events = [event for event in self.events if event.id not in ids]
+            return _Result([])
+        raise AssertionError(f"unexpected statement {stmt}")
+
+    async def commit(self):
+        self.commits += 1
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+    def scalar(self):
+        return self.rows[0] if self.rows else None
+
+
+def event(id, kind, user_id=1, payload=None, age=0):
+    created_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=age)
+    return OutboxEvent(id=id, kind=kind, user_id=user_id, payload=payload or {}, created_at=created_at)
+
+
+class ConsumeTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.evicted = []
+
+        async def evict(user_id, *scopes):
+            self.evicted.append((user_id, set(scopes)))
+
+        self.original_evict = outbox.evict
+        self.original_invalidate = outbox.invalidate
+        outbox.evict = outbox.invalidate = evict
+
+    def tearDown(self):
+        outbox.evict = self.original_evict
+        outbox.invalidate = self.original_invalidate
+
+    async def test_unhandled_head_does_not_starve_later_events(self):
+        # More unhandled events than a batch sit in front of an invalidation.
+        events = [event(id, "no_such_handler") for id in range(1, 6)]
+        events.append(event(6, outbox.INVALIDATE, user_id=7, payload={"scopes": ["wallets"]}))
+        session = FakeSession(events)
+
+        self.assertEqual(await outbox.consume(session, batch_size=2), 1)
+        self.assertEqual(self.evicted, [(7, {"wallets"})])
+        # The unhandled events stay queued for a process that can deliver them.
+        self.assertEqual([e.id for e in session.events], [1, 2, 3, 4, 5])
+        self.assertEqual(await outbox.consume(session, batch_size=2), 0)
+
+    async def test_registered_handler_is_delivered(self):
+        delivered = []
+
+        @outbox.handler("test_event")
+        async def on_test_event(e):
+            delivered.append(e.id)
+
+        try:
+            session = FakeSession([event(1, "test_event"), event(2, outbox.INVALIDATE, payload={"scopes": ["operations"]})])
+            self.assertEqual(await outbox.consume(session, batch_size=10), 2)
+            self.assertEqual(delivered, [1])
+            self.assertEqual(session.events, [])
+            self.assertEqual(session.commits, 1)
+        finally:
+            del outbox.handlers["test_event"]
+
+    async def test_lag_is_measured_when_delivery_fails(self):
+        @outbox.handler("test_event")
+        async def on_test_event(e):
+            raise RuntimeError("delivery failed")
+
+        try:
+            session = FakeSession([event(1, "no_such_handler", age=600), event(2, "test_event", age=60)])
+            with self.assertRaises(RuntimeError):
+                await outbox.consume(session, batch_size=10)
+            (_, _, lag), = outbox.outbox_lag.samples()
+            self.assertGreaterEqual(lag, 60)
+            self.assertLess(lag, 600)
+            self.assertEqual(len(session.events), 2)
+        finally:
+            del outbox.handlers["test_event"]
+
+    async def test_committed_evicts_the_session_invalidations(self):
+        session = FakeSession([])
+        await outbox.emit_invalidation(session, 7, ["wallets"])
+        await outbox.emit_invalidations(session, {7: ["operations"], 8: ["budgets"]})
+
+        await outbox.committed(session)
+        self.assertEqual(sorted(self.evicted), [(7, {"wallets", "operations"}), (8, {"budgets"})])
+        self.assertEqual(session.info, {})
+        await outbox.committed(session)
+        self.assertEqual(len(self.evicted), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Keyset pagination cursors.
+
+    python -m unittest discover tests
+"""
+import base64
+import datetime
+import os
+import unittest
+
+from types import SimpleNamespace
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+from fastapi import HTTPException
+
+from src.pagination import decode_cursor, encode_cursor, page
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        created_at = datetime.datetime(2024, 3, 10, 12, 30, 15, 123456)
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+
+    def test_invalid_cursors_are_rejected(self):
+        bad = [
+            "not base64!",
+            base64.urlsafe_b64encode(b"2024-03-10T12:00:00").decode(),
+            base64.urlsafe_b64encode(b"yesterday|1").decode(),
+            base64.urlsafe_b64encode(b"2024-03-10T12:00:00|one").decode(),
+            base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+        ]
+        for cursor in bad:
+            with self.subTest(cursor=cursor), self.assertRaises(HTTPException) as raised:
+                decode_cursor(cursor)
+            self.assertEqual(raised.exception.status_code, 400)
+
+
+class PageTest(unittest.TestCase):
+    def rows(self, count):
+        start = datetime.datetime(2024, 3, 10)
+        return [SimpleNamespace(id=count - n, created_at=start - datetime.timedelta(minutes=n)) for n in range(count)]
+
+    def test_last_page_has_no_cursor(self):
+        rows = self.rows(3)
+        self.assertEqual(page(rows, 3), (rows, None))
+
+    def test_extra_row_yields_the_next_cursor(self):
+        rows = self.rows(4)
+        items, cursor = page(rows, 3)
+        self.assertEqual(items, rows[:3])
+        self.assertEqual(decode_cursor(cursor), (rows[2].created_at, rows[2].id))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""
+Exchange rate file loading.
+
+    python -m unittest discover tests
+"""
+import decimal
+import os
+import tempfile
+import unittest
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+from src.currency.rates import read_rates
+
+
+class ReadRatesTest(unittest.TestCase):
+    def read(self, text):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+            file.write(text)
+        self.addCleanup(os.remove, file.name)
+        return read_rates(file.name)
+
+    def test_rates_are_read_exactly(self):
+        self.assertEqual(self.read("currency,rate\n usd , 92.4517\neur,100.1\n"), {
+            "USD": decimal.Decimal("92.4517"),
+            "EUR": decimal.Decimal("100.1"),
+        })
+
+    def test_bad_lines_are_rejected(self):
+        for line in ("USD,", "USD,abc", "USD,0", "USD,-1", "USD,NaN", "USD,Infinity", ",1", "DOLLAR,1"):
+            with self.subTest(line=line), self.assertRaisesRegex(ValueError, "line 3"):
+                self.read(f"currency,rate\nEUR,100\n{line}\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
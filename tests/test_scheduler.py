@@ -0,0 +1,52 @@
+"""
+Recurring operation schedules.
+
+    python -m unittest discover tests
+"""
+import datetime
+import os
+import unittest
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+from src.models.models import Interval
+from src.recurring.scheduler import first_run, next_run
+
+
+def at(year, month, day, hour=9):
+    return datetime.datetime(year, month, day, hour)
+
+
+class NextRunTest(unittest.TestCase):
+    def test_daily_and_weekly(self):
+        self.assertEqual(next_run(at(2024, 1, 1), Interval.daily, at(2024, 2, 28)), at(2024, 2, 29))
+        self.assertEqual(next_run(at(2024, 1, 1), Interval.weekly, at(2024, 12, 30)), at(2025, 1, 6))
+
+    def test_monthly_keeps_the_start_day(self):
+        self.assertEqual(next_run(at(2024, 1, 15), Interval.monthly, at(2024, 12, 15)), at(2025, 1, 15))
+
+    def test_monthly_is_clamped_to_the_month_end(self):
+        starts_at = at(2024, 1, 31)
+        self.assertEqual(next_run(starts_at, Interval.monthly, starts_at), at(2024, 2, 29))
+        self.assertEqual(next_run(starts_at, Interval.monthly, at(2024, 2, 29)), at(2024, 3, 31))
+        self.assertEqual(next_run(starts_at, Interval.monthly, at(2024, 3, 31)), at(2024, 4, 30))
+
+
+class FirstRunTest(unittest.TestCase):
+    def test_future_start_is_the_first_run(self):
+        self.assertEqual(first_run(at(2024, 5, 1), Interval.daily, at(2024, 4, 1)), at(2024, 5, 1))
+
+    def test_past_start_is_not_backfilled(self):
+        now = at(2024, 3, 10, 12)
+        self.assertEqual(first_run(at(2024, 1, 1), Interval.daily, now), at(2024, 3, 11))
+        self.assertEqual(first_run(at(2024, 1, 1), Interval.weekly, now), at(2024, 3, 11))
+        self.assertEqual(first_run(at(2024, 1, 31), Interval.monthly, now), at(2024, 3, 31))
+
+    def test_run_due_now_is_kept(self):
+        self.assertEqual(first_run(at(2024, 1, 1), Interval.daily, at(2024, 3, 10)), at(2024, 3, 10))
+        self.assertEqual(first_run(at(2024, 1, 31), Interval.monthly, at(2024, 2, 29)), at(2024, 2, 29))
+
+
+if __name__ == "__main__":
+    unittest.main()
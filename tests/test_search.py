@@ -0,0 +1,37 @@
+"""
+Operation search query building.
+
+    python -m unittest discover tests
+"""
+import os
+import unittest
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+from fastapi import HTTPException
+
+from src.operations.search import MAX_TERMS, prefix_query
+
+
+class PrefixQueryTest(unittest.TestCase):
+    def test_every_word_is_a_prefix(self):
+        self.assertEqual(prefix_query("Pharm 24"), "pharm:* & 24:*")
+
+    def test_tsquery_operators_are_dropped(self):
+        self.assertEqual(prefix_query("coffee & !tea | (milk:*)"), "coffee:* & tea:* & milk:*")
+
+    def test_unicode_words_are_kept(self):
+        self.assertEqual(prefix_query("Пятёрочка"), "пятёрочка:*")
+
+    def test_terms_are_capped(self):
+        self.assertEqual(prefix_query(" ".join(f"w{n}" for n in range(20))).count(":*"), MAX_TERMS)
+
+    def test_no_words_is_rejected(self):
+        with self.assertRaises(HTTPException) as raised:
+            prefix_query(" !& ")
+        self.assertEqual(raised.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Budget alert thresholds.
+
+    python -m unittest discover tests
+"""
+import decimal
+import os
+import unittest
+
+from unittest import mock
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+from src.budgets.spending import crossed
+from src.config import settings
+
+
+D = decimal.Decimal
+
+
+class CrossedTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(settings, "BUDGET_ALERT_THRESHOLDS", [80, 100])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_below_every_threshold(self):
+        self.assertEqual(crossed(D("100"), D("10"), D("79.99")), [])
+
+    def test_reaching_a_threshold_crosses_it(self):
+        self.assertEqual(crossed(D("100"), D("79.99"), D("80")), [80])
+
+    def test_one_write_can_cross_several(self):
+        self.assertEqual(crossed(D("100"), D("0"), D("150")), [80, 100])
+
+    def test_already_crossed_thresholds_are_not_repeated(self):
+        self.assertEqual(crossed(D("100"), D("80"), D("90")), [])
+        self.assertEqual(crossed(D("100"), D("100"), D("120")), [])
+
+    def test_refunds_cross_nothing(self):
+        self.assertEqual(crossed(D("100"), D("120"), D("50")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
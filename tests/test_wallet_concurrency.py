@@ -0,0 +1,131 @@
+"""
+Hammer one wallet with concurrent writes and check that no update was lost.
+
+Needs a migrated Postgres from the DB_* settings; skipped when none answers.
+
+    python -m unittest tests.test_wallet_concurrency
+
+Every worker adds and deletes operations on the same wallet of a fresh user
+through the ASGI app, and now and then renames it through change_wallet,
+re-reading the version and retrying on 409. At the end the wallet's budget
+must equal the signed sum of the operations written, and its version must
+have moved once per write.
+"""
+import asyncio
+import os
+import random
+import unittest
+import uuid
+
+for name, value in (("DB_HOST", "localhost"), ("DB_PORT", "5432"), ("DB_USER", "test"), ("DB_PASS", "test"), ("DB_NAME", "test")):
+    os.environ.setdefault(name, value)
+
+import httpx
+
+from sqlalchemy import case, delete, func, select
+
+from src.auth.auth import get_jwt_strategy
+from src.config import settings
+from src.database import async_session_maker, engine
+from src.main import app
+from src.models.models import Operation, TypeOperation, User, Wallet
+
+
+WORKERS = 20
+WRITES = 20
+RENAME_ATTEMPTS = 20
+
+
+def signed_sum(wallet_id: int):
+    return select(
+        func.coalesce(func.sum(case((Operation.type_operation == TypeOperation.profit, Operation.amount), else_=-Operation.amount)), 0)
+    ).where(Operation.wallet_id == wallet_id)
+
+
+class WalletConcurrencyTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        try:
+            async with engine.connect() as connection:
+                await asyncio.wait_for(connection.execute(select(1)), 5)
+        except Exception as e:
+            await engine.dispose()
+            self.skipTest(f"no database: {e}")
+
+        async with async_session_maker() as session:
+            tag = uuid.uuid4().hex[:12]
+            self.user = User(username=f"stress-{tag}", email=f"stress-{tag}@example.com", hashed_password="-", is_active=True, is_superuser=False, is_verified=True)
+            session.add(self.user)
+            await session.flush()
+            self.wallet = Wallet(user_id=self.user.id, name="Stress", budget=0, currency=settings.BASE_CURRENCY)
+            session.add(self.wallet)
+            await session.commit()
+            await session.refresh(self.wallet)
+            session.expunge_all()
+
+    async def asyncTearDown(self):
+        async with async_session_maker() as session:
+            await session.execute(delete(User).where(User.id == self.user.id))
+            await session.commit()
+        await engine.dispose()
+
+    async def test_no_update_is_lost(self):
+        wallet_id = self.wallet.id
+        headers = {"Cookie": f"bonds={await get_jwt_strategy().write_token(self.user)}"}
+        counts = {"add": 0, "delete": 0, "rename": 0, "conflicts": 0, "errors": 0}
+
+        async def rename(client: httpx.AsyncClient) -> bool:
+            # get_wallets is cached and may briefly return an older version: give up eventually.
+            for _ in range(RENAME_ATTEMPTS):
+                wallets = (await client.get("/wallet/get_wallets", params={"operations": 0}, headers=headers)).json()
+                current = next(item for item in wallets if item["id"] == wallet_id)
+                body = {"name": f"Stress {random.randrange(1000)}", "budget": current["budget"], "version": current["version"]}
+                response = await client.post("/wallet/change_wallet", params={"wallet_id": wallet_id}, json=body, headers=headers)
+                if response.status_code != 409:
+                    return response.status_code == 200
+                counts["conflicts"] += 1
+                await asyncio.sleep(random.random() * 0.05)
+            return False
+
+        async def worker(client: httpx.AsyncClient) -> None:
+            # Each worker deletes only the operations it added itself.
+            posted = []
+            for _ in range(WRITES):
+                choice = random.random()
+                if choice < 0.05:
+                    counts["rename" if await rename(client) else "errors"] += 1
+                    continue
+                if choice < 0.25 and posted:
+                    response = await client.post("/operation/delete_operation", params={"operation_id": posted.pop()}, headers=headers)
+                    kind = "delete"
+                else:
+                    body = {
+                        "wallet_id": wallet_id,
+                        "category": "food",
+                        "type_operation": random.choice(["profit", "loss"]),
+                        "amount": f"{random.randint(1, 50000) / 100:.2f}",
+                    }
+                    response = await client.post("/operation/add_operation", json=body, headers=headers)
+                    kind = "add"
+                if response.status_code != 200:
+                    counts["errors"] += 1
+                    continue
+                counts[kind] += 1
+                if kind == "add":
+                    posted.append(response.json()["id"])
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+            await asyncio.gather(*[worker(client) for _ in range(WORKERS)])
+
+        async with async_session_maker() as session:
+            budget, version = (await session.execute(select(Wallet.budget, Wallet.version).where(Wallet.id == wallet_id))).one()
+            total = (await session.execute(signed_sum(wallet_id))).scalar_one()
+
+        self.assertEqual(counts["errors"], 0, counts)
+        # Renames write the budget the client read, so they may not move it either.
+        self.assertEqual(budget, total, counts)
+        self.assertEqual(version - self.wallet.version, counts["add"] + counts["delete"] + counts["rename"], counts)
+
+
+if __name__ == "__main__":
+    unittest.main()